@@ -1,9 +1,17 @@
 import yaml
 import os
-from typing import Dict, Any, List
+import json
+import tempfile
+from functools import cached_property
+from typing import Dict, Any, List, Optional, Tuple, cast
 from dataclasses import dataclass
 from dotenv import load_dotenv
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 
 @dataclass
 class DatabaseConfig:
@@ -14,7 +22,7 @@ class DatabaseConfig:
     password: str = None
 
 
-@dataclass
+@dataclass(frozen=True)
 class TableConfig:
     name: str
     strategy: str
@@ -28,6 +36,8 @@ class TableConfig:
     row_limit: int = None
     partition_function: str = None
     partition_scheme: str = None
+    server_side_copy: bool = False
+    data_compression: str = None
 
 
 @dataclass
@@ -38,19 +48,90 @@ class Settings:
     max_retries: int
     dry_run: bool = False
     verbose_logging: bool = False
+    max_workers: int = 4
+    pool_size: int = 5
+    status_cache_ttl: float = 5
+
+
+def _has_non_str_keys(value: Any) -> bool:
+    if isinstance(value, dict):
+        return any(not isinstance(key, str) or _has_non_str_keys(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(_has_non_str_keys(item) for item in value)
+    return False
 
 
 class ConfigManager:
     def __init__(self, config_path: str = "config/config.yaml"):
         load_dotenv()
-        self.config_path = config_path
-        self._config = self._load_config()
+        self.config_path: Optional[str] = config_path
+        self._set_config(self._load_config())
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any], config_path: Optional[str] = None) -> "ConfigManager":
+        load_dotenv()
+        manager = cls.__new__(cls)
+        manager.config_path = config_path
+        manager._set_config(config)
+        return manager
+
+    def _set_config(self, config: Dict[str, Any]) -> None:
+        self._config = config
+        self._table_configs: Tuple[TableConfig, ...] = tuple(TableConfig(**table) for table in config["tables"])
+        self._table_by_name = {table_config.name: table_config for table_config in self._table_configs}
 
     def _load_config(self) -> Dict[str, Any]:
-        with open(self.config_path, "r") as file:
-            return yaml.safe_load(file)
+        assert self.config_path is not None, "ConfigManager built from a dict has no file to load"
+        stat = os.stat(self.config_path)
+        # mtime alone misses same-tick edits and copies that preserve mtime
+        cache_key = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        cache_path = f"{self.config_path}.cache.json"
 
-    def get_source_db_config(self) -> DatabaseConfig:
+        cached = self._read_cache(cache_path, cache_key)
+        if cached is not None:
+            return cached
+
+        with open(self.config_path, "rb") as file:
+            config: Dict[str, Any] = yaml.load(file, Loader=_Loader)
+
+        self._write_cache(cache_path, cache_key, config)
+        return config
+
+    def _read_cache(self, cache_path: str, cache_key: List[int]) -> Optional[Dict[str, Any]]:
+        try:
+            with open(cache_path, "rb") as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if cached.get("key") != cache_key:
+            return None
+        return cast(Optional[Dict[str, Any]], cached.get("config"))
+
+    def _write_cache(self, cache_path: str, cache_key: List[int], config: Dict[str, Any]) -> None:
+        # The cache is an optimisation only: read-only directories or values JSON
+        # cannot represent (e.g. YAML dates) simply leave the YAML as the source of truth.
+        # json.dump would silently stringify non-str keys, so a warm start would differ from a cold one.
+        if _has_non_str_keys(config):
+            return
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump({"key": cache_key, "config": config}, file)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError):
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    @cached_property
+    def source_db_config(self) -> DatabaseConfig:
         db_config = self._config["databases"]["source"]
         return DatabaseConfig(
             server=db_config["server"],
@@ -60,7 +141,8 @@ class ConfigManager:
             password=os.getenv("SOURCE_DB_PASSWORD"),
         )
 
-    def get_target_db_config(self) -> DatabaseConfig:
+    @cached_property
+    def target_db_config(self) -> DatabaseConfig:
         db_config = self._config["databases"]["target"]
         return DatabaseConfig(
             server=db_config["server"],
@@ -70,18 +152,24 @@ class ConfigManager:
             password=os.getenv("TARGET_DB_PASSWORD"),
         )
 
-    def get_table_configs(self) -> List[TableConfig]:
-        tables = []
-        for table_config in self._config["tables"]:
-            tables.append(TableConfig(**table_config))
-        return tables
+    @cached_property
+    def settings(self) -> Settings:
+        return Settings(**self._config["settings"])
+
+    def get_source_db_config(self) -> DatabaseConfig:
+        return self.source_db_config
+
+    def get_target_db_config(self) -> DatabaseConfig:
+        return self.target_db_config
+
+    def get_table_configs(self) -> Tuple[TableConfig, ...]:
+        return self._table_configs
 
     def get_table_config(self, table_name: str) -> TableConfig:
-        for table_config in self._config["tables"]:
-            if table_config["name"] == table_name:
-                return TableConfig(**table_config)
-        raise ValueError(f"Table '{table_name}' not found in configuration")
+        try:
+            return self._table_by_name[table_name]
+        except KeyError:
+            raise ValueError(f"Table '{table_name}' not found in configuration") from None
 
     def get_settings(self) -> Settings:
-        settings_config = self._config["settings"]
-        return Settings(**settings_config)
+        return self.settings
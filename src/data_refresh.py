@@ -1,10 +1,14 @@
 import logging
 import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple, cast
 from .config import ConfigManager
 from .database import DatabaseConnection, DatabaseHandler
-from .refresh_strategies import get_strategy
+from .refresh_strategies import get_strategy, load_existing_partitions
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -25,7 +29,68 @@ class DataRefreshService:
         self.source_handler = DatabaseHandler(self.source_connection)
         self.target_handler = DatabaseHandler(self.target_connection)
 
-    def test_connections(self) -> Dict[str, bool]:
+        self._table_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._table_locks_guard = threading.Lock()
+        self._existing_partitions_cache: Dict[str, Set[int]] = {}
+        self._status_cache: Dict[Any, Tuple[float, Any]] = {}
+        self._status_cache_lock = threading.Lock()
+        self._status_compute_locks: Dict[Any, Tuple[threading.Lock, int]] = {}
+        self._status_generation = 0
+
+    def _fresh_status(self, key: Any) -> Optional[Tuple[float, Any]]:
+        entry = self._status_cache.get(key)
+        if entry and time.monotonic() - entry[0] < self.settings.status_cache_ttl:
+            return entry
+        return None
+
+    def _cached_status(self, key: Any, compute: Callable[[], Any], use_cache: bool) -> Any:
+        with self._status_cache_lock:
+            entry = self._fresh_status(key) if use_cache else None
+            if entry:
+                return entry[1]
+            compute_lock, users = self._status_compute_locks.get(key, (threading.Lock(), 0))
+            self._status_compute_locks[key] = (compute_lock, users + 1)
+
+        # A per-key lock lets concurrent requests for the same status share one round of queries
+        # without blocking other keys or invalidation
+        try:
+            with compute_lock:
+                with self._status_cache_lock:
+                    entry = self._fresh_status(key) if use_cache else None
+                    if entry:
+                        return entry[1]
+                    generation = self._status_generation
+
+                value = compute()
+
+                with self._status_cache_lock:
+                    # Don't repopulate with a result computed before a refresh invalidated the cache
+                    if generation == self._status_generation:
+                        self._evict_expired_status()
+                        self._status_cache[key] = (time.monotonic(), value)
+                return value
+        finally:
+            with self._status_cache_lock:
+                compute_lock, users = self._status_compute_locks[key]
+                if users == 1:
+                    del self._status_compute_locks[key]
+                else:
+                    self._status_compute_locks[key] = (compute_lock, users - 1)
+
+    def _evict_expired_status(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, entry in self._status_cache.items() if now - entry[0] >= self.settings.status_cache_ttl]:
+            del self._status_cache[key]
+
+    def _invalidate_status_cache(self) -> None:
+        with self._status_cache_lock:
+            self._status_generation += 1
+            self._status_cache.clear()
+
+    def test_connections(self, use_cache: bool = True) -> Dict[str, bool]:
+        return cast(Dict[str, bool], self._cached_status("connections", self._test_connections, use_cache))
+
+    def _test_connections(self) -> Dict[str, bool]:
         results = {
             "source": self.source_connection.test_connection(),
             "target": self.target_connection.test_connection(),
@@ -37,7 +102,9 @@ class DataRefreshService:
     def refresh_table(self, table_name: str) -> Dict[str, Any]:
         try:
             table_config = self.config_manager.get_table_config(table_name)
-            strategy = get_strategy(self.source_handler, self.target_handler, table_config)
+            strategy = get_strategy(
+                self.source_handler, self.target_handler, table_config, self._existing_partitions_cache
+            )
 
             if self.settings.dry_run:
                 logger.info(f"DRY RUN: Would refresh table {table_name} using {table_config.strategy}")
@@ -48,7 +115,12 @@ class DataRefreshService:
                     "sync_mode": table_config.sync_mode,
                 }
 
-            return strategy.refresh_table()
+            with self._table_lock(table_name):
+                try:
+                    with self.source_handler.metadata_cache(), self.target_handler.metadata_cache():
+                        return strategy.refresh_table()
+                finally:
+                    self._invalidate_status_cache()
 
         except Exception as e:
             logger.error(f"Failed to refresh table {table_name}: {e}")
@@ -59,15 +131,26 @@ class DataRefreshService:
                 "timestamp": datetime.now().isoformat(),
             }
 
-    def refresh_all_tables(self) -> List[Dict[str, Any]]:
+    def _table_lock(self, table_name: str) -> threading.Lock:
+        with self._table_locks_guard:
+            return self._table_locks[table_name]
+
+    def refresh_all_tables(self, max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
         table_configs = self.config_manager.get_table_configs()
-        results = []
+        max_workers = max(1, min(max_workers or self.settings.max_workers, len(table_configs)))
 
-        logger.info(f"Starting refresh for {len(table_configs)} tables")
+        logger.info(f"Starting refresh for {len(table_configs)} tables with {max_workers} workers")
 
-        for table_config in table_configs:
-            result = self.refresh_table(table_config.name)
-            results.append(result)
+        if not self.settings.dry_run and any(
+            table_config.strategy == "staging_partition_switch" for table_config in table_configs
+        ):
+            self._load_existing_partitions()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(self.refresh_table, [table_config.name for table_config in table_configs]))
+        finally:
+            self._existing_partitions_cache.clear()
 
         logger.info(
             f"Completed refresh for all tables. Success: {sum(1 for r in results if r.get('status') == 'success')}, Errors: {sum(1 for r in results if r.get('status') == 'error')}"
@@ -75,13 +158,30 @@ class DataRefreshService:
 
         return results
 
-    def get_table_status(self, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    def _load_existing_partitions(self) -> None:
+        try:
+            self._existing_partitions_cache.update(load_existing_partitions(self.target_handler))
+        except Exception as e:
+            logger.warning(f"Could not preload existing partitions, falling back to per-table lookups: {e}")
+
+    def get_table_status(self, table_name: Optional[str] = None, use_cache: bool = True) -> List[Dict[str, Any]]:
+        # Only configured tables are cached, so arbitrary names from the API can't grow the cache
+        if table_name and not any(config.name == table_name for config in self.config_manager.get_table_configs()):
+            return self._get_table_status(table_name)
+
+        return cast(
+            List[Dict[str, Any]],
+            self._cached_status(("status", table_name), lambda: self._get_table_status(table_name), use_cache),
+        )
+
+    def _get_table_status(self, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
         table_configs = self.config_manager.get_table_configs()
 
         if table_name:
-            table_configs = [config for config in table_configs if config.name == table_name]
+            table_configs = tuple(config for config in table_configs if config.name == table_name)
 
         status_list = []
+        last_checked = datetime.now().isoformat()
 
         for table_config in table_configs:
             try:
@@ -94,7 +194,7 @@ class DataRefreshService:
                     "target_count": target_count,
                     "sync_mode": table_config.sync_mode,
                     "strategy": table_config.strategy,
-                    "last_checked": datetime.now().isoformat(),
+                    "last_checked": last_checked,
                 }
 
                 if table_config.incremental_column:
@@ -112,13 +212,13 @@ class DataRefreshService:
             except Exception as e:
                 logger.error(f"Failed to get status for table {table_config.name}: {e}")
                 status_list.append(
-                    {"table_name": table_config.name, "error": str(e), "last_checked": datetime.now().isoformat()}
+                    {"table_name": table_config.name, "error": str(e), "last_checked": last_checked}
                 )
 
         return status_list
 
 
-def main():
+def main() -> None:
     parser = argparse.ArgumentParser(description="Data Refresh Service")
     parser.add_argument("--config", default="config/config.yaml", help="Configuration file path")
     parser.add_argument("--table", help="Specific table to refresh")
@@ -126,14 +226,15 @@ def main():
     parser.add_argument("--test-connections", action="store_true", help="Test database connections")
     parser.add_argument("--status", action="store_true", help="Show table status")
     parser.add_argument("--force", action="store_true", help="Skip confirmations")
+    parser.add_argument("--workers", type=int, help="Number of tables to refresh concurrently")
 
     args = parser.parse_args()
 
     service = DataRefreshService(args.config)
 
     if args.test_connections:
-        results = service.test_connections()
-        print(f"Connection test results: {results}")
+        connection_results = service.test_connections()
+        print(f"Connection test results: {connection_results}")
         return
 
     if args.status:
@@ -162,7 +263,7 @@ def main():
                 print("Cancelled.")
                 return
 
-        results = service.refresh_all_tables()
+        results = service.refresh_all_tables(args.workers)
         for result in results:
             print(f"Table {result['table_name']}: {result.get('status', 'unknown')}")
 
@@ -1,18 +1,81 @@
 import pyodbc
 import logging
-from typing import Optional, List, Dict, Any
-from contextlib import contextmanager
+import queue
+import threading
+import time
+from itertools import chain, islice
+from typing import Optional, List, Dict, Any, Callable, Generator, Iterable, Iterator, NamedTuple, Sequence, Tuple, cast
+from contextlib import closing, contextmanager
 from .config import DatabaseConfig, Settings
 
 
 logger = logging.getLogger(__name__)
 
+# Pooled connections idle for longer than this are checked before reuse, since the server may have dropped them
+_IDLE_CHECK_SECONDS = 60
+
+
+def quote_identifier(name: str) -> str:
+    # QUOTENAME-style bracketing of each dotted part, so reserved words and spaces survive
+    return ".".join("[" + part.replace("]", "]]") + "]" for part in name.split("."))
+
+
+def _prefetch_batches(
+    rows: Iterable[Sequence[Any]], batch_size: int, depth: int = 2
+) -> Generator[List[Sequence[Any]], None, None]:
+    # Reads the next batches from the source on a worker thread while the caller is busy writing the current one
+    batches: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def produce() -> None:
+        iterator = iter(rows)
+        try:
+            while not stop.is_set():
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                put(batch)
+        except Exception as e:
+            put(e)
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            put(None)
+
+    producer = threading.Thread(target=produce, name="bulk-insert-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+class QueryResult(NamedTuple):
+    columns: Tuple[str, ...]
+    rows: List[Sequence[Any]]
+
 
 class DatabaseConnection:
     def __init__(self, config: DatabaseConfig, settings: Settings):
         self.config = config
         self.settings = settings
         self._connection_string = self._build_connection_string()
+        self._pool: "queue.Queue[Tuple[pyodbc.Connection, float]]" = queue.Queue(maxsize=settings.pool_size)
 
     def _build_connection_string(self) -> str:
         if self.config.auth_type == "windows":
@@ -34,12 +97,13 @@ class DatabaseConnection:
             )
 
     @contextmanager
-    def get_connection(self):
+    def get_connection(self) -> Iterator["pyodbc.Connection"]:
         conn = None
+        reusable = False
         try:
-            conn = pyodbc.connect(self._connection_string)
-            conn.timeout = self.settings.command_timeout
+            conn = self._acquire()
             yield conn
+            reusable = True
         except Exception as e:
             logger.error(f"Database connection error: {e}")
             if conn:
@@ -47,7 +111,57 @@ class DatabaseConnection:
             raise
         finally:
             if conn:
-                conn.close()
+                if reusable:
+                    self._release(conn)
+                else:
+                    conn.close()
+
+    def _acquire(self) -> "pyodbc.Connection":
+        while True:
+            try:
+                conn, released_at = self._pool.get_nowait()
+            except queue.Empty:
+                break
+
+            if time.monotonic() - released_at < _IDLE_CHECK_SECONDS or self._is_alive(conn):
+                return conn
+
+        conn = pyodbc.connect(self._connection_string)
+        conn.timeout = self.settings.command_timeout
+        return conn
+
+    def _is_alive(self, conn: "pyodbc.Connection") -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding stale pooled connection: {e}")
+            self._discard(conn)
+            return False
+
+    def _release(self, conn: "pyodbc.Connection") -> None:
+        # Writes have already committed and failed borrows never reach the pool, so there is nothing to roll back;
+        # idle connections are probed in _acquire instead of paying a round trip on every release
+        try:
+            self._pool.put_nowait((conn, time.monotonic()))
+        except queue.Full:
+            conn.close()
+
+    def _discard(self, conn: "pyodbc.Connection") -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
 
     def test_connection(self) -> bool:
         try:
@@ -63,67 +177,234 @@ class DatabaseConnection:
 class DatabaseHandler:
     def __init__(self, connection: DatabaseConnection):
         self.connection = connection
+        self._local = threading.local()
+        self._insert_sql: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+
+    @contextmanager
+    def metadata_cache(self) -> Iterator[None]:
+        # Caches COUNT/MAX lookups for the current thread until the outermost block exits.
+        if getattr(self._local, "cache", None) is not None:
+            yield
+            return
+
+        self._local.cache = {}
+        try:
+            yield
+        finally:
+            self._local.cache = None
+
+    @contextmanager
+    def transaction(self) -> Iterator["pyodbc.Connection"]:
+        # Routes this thread's queries and non-queries through one connection and commits once when the outermost
+        # block exits; any error rolls the whole block back. Streaming reads and bulk inserts keep their own connection.
+        if getattr(self._local, "transaction", None) is not None:
+            yield self._local.transaction
+            return
 
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
         with self.connection.get_connection() as conn:
+            self._local.transaction = conn
+            try:
+                yield conn
+                conn.commit()
+            finally:
+                self._local.transaction = None
+
+    @contextmanager
+    def _borrow_connection(self) -> Iterator["pyodbc.Connection"]:
+        conn = getattr(self._local, "transaction", None)
+        if conn is not None:
+            yield conn
+            return
+
+        with self.connection.get_connection() as conn:
+            yield conn
+
+    def _commit(self, conn: "pyodbc.Connection") -> None:
+        if getattr(self._local, "transaction", None) is None:
+            conn.commit()
+
+    def invalidate(self, table_name: Optional[str] = None) -> None:
+        cache = getattr(self._local, "cache", None)
+        if not cache:
+            return
+
+        if table_name is None:
+            cache.clear()
+        else:
+            for key in [key for key in cache if key[1] == table_name]:
+                del cache[key]
+
+    def _cached(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        cache = getattr(self._local, "cache", None)
+        if cache is None:
+            return compute()
+
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> QueryResult:
+        with self._borrow_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params or ())
 
-            columns = [column[0] for column in cursor.description] if cursor.description else []
-            rows = cursor.fetchall()
+            columns = tuple(column[0] for column in cursor.description) if cursor.description else ()
+            return QueryResult(columns, cursor.fetchall())
 
-            return [dict(zip(columns, row)) for row in rows]
+    def execute_query_rows(self, query: str, params: Optional[tuple] = None) -> List[pyodbc.Row]:
+        with self._borrow_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params or ())
+            return cast(List[pyodbc.Row], cursor.fetchall())
 
-    def execute_non_query(self, query: str, params: Optional[tuple] = None) -> int:
+    def execute_query_columnar(
+        self, query: str, params: Optional[tuple] = None, arraysize: int = 1000
+    ) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+        rows = self._iter_rows(query, params, arraysize)
+        columns = next(rows)
+        return columns, rows
+
+    def _iter_rows(self, query: str, params: Optional[tuple], arraysize: int) -> Iterator[Any]:
+        # Yields the column names first so the caller can read them before consuming any rows.
         with self.connection.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params or ())
-            conn.commit()
-            return cursor.rowcount
+
+            yield [column[0] for column in cursor.description] if cursor.description else []
+
+            while True:
+                rows = cursor.fetchmany(arraysize)
+                if not rows:
+                    break
+                yield from rows
+
+    def execute_non_query(self, query: str, params: Optional[tuple] = None) -> int:
+        with self._borrow_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params or ())
+            self._commit(conn)
+            self.invalidate()
+            return cast(int, cursor.rowcount)
 
     def get_max_value(self, table_name: str, column_name: str) -> Optional[Any]:
-        query = f"SELECT MAX({column_name}) as max_value FROM {table_name}"
+        return self._cached(("max", table_name, column_name), lambda: self._query_max_value(table_name, column_name))
+
+    def _query_max_value(self, table_name: str, column_name: str) -> Optional[Any]:
+        query = f"SELECT MAX({quote_identifier(column_name)}) as max_value FROM {quote_identifier(table_name)}"
         try:
-            result = self.execute_query(query)
-            return result[0]["max_value"] if result and result[0]["max_value"] is not None else None
+            result = self.execute_query_rows(query)
+            return result[0][0] if result else None
         except Exception as e:
             logger.warning(f"Could not get max value for {table_name}.{column_name}: {e}")
             return None
 
-    def get_table_count(self, table_name: str, where_clause: str = None) -> int:
-        query = f"SELECT COUNT(*) as count FROM {table_name}"
+    def get_table_count(self, table_name: str, where_clause: Optional[str] = None) -> int:
+        return cast(
+            int,
+            self._cached(
+                ("count", table_name, where_clause), lambda: self._query_table_count(table_name, where_clause)
+            ),
+        )
+
+    def _query_table_count(self, table_name: str, where_clause: Optional[str] = None) -> int:
+        query = f"SELECT COUNT(*) as count FROM {quote_identifier(table_name)}"
         if where_clause:
             query += f" WHERE {where_clause}"
 
-        result = self.execute_query(query)
-        return result[0]["count"] if result else 0
+        result = self.execute_query_rows(query)
+        return cast(int, result[0][0]) if result else 0
+
+    def get_sync_state(self, table_name: str, column_name: str) -> Tuple[int, Optional[Any]]:
+        return cast(
+            Tuple[int, Optional[Any]],
+            self._cached(("sync", table_name, column_name), lambda: self._query_sync_state(table_name, column_name)),
+        )
+
+    def _query_sync_state(self, table_name: str, column_name: str) -> Tuple[int, Optional[Any]]:
+        query = (
+            f"SELECT COUNT_BIG(*) as row_count, MAX({quote_identifier(column_name)}) as max_value "
+            f"FROM {quote_identifier(table_name)}"
+        )
+        result = self.execute_query_rows(query)
+        row_count, max_value = (result[0][0], result[0][1]) if result else (0, None)
+
+        # Let later plain count/max lookups in the same metadata_cache block reuse this probe
+        cache = getattr(self._local, "cache", None)
+        if cache is not None:
+            cache.setdefault(("count", table_name, None), row_count)
+            cache.setdefault(("max", table_name, column_name), max_value)
+
+        return row_count, max_value
 
     def truncate_table(self, table_name: str) -> None:
-        query = f"TRUNCATE TABLE {table_name}"
+        query = f"TRUNCATE TABLE {quote_identifier(table_name)}"
         self.execute_non_query(query)
         logger.info(f"Truncated table {table_name}")
 
-    def bulk_insert(self, table_name: str, data: List[Dict[str, Any]], batch_size: int = 1000) -> int:
-        if not data:
-            return 0
+    def is_same_server(self, other: "DatabaseHandler") -> bool:
+        return self.connection.config.server.lower() == other.connection.config.server.lower()
+
+    def copy_from(
+        self, source: "DatabaseHandler", table_name: str, query_suffix: str = "", params: Optional[tuple] = None
+    ) -> int:
+        target_table = quote_identifier(table_name)
+        schema_separator = "." if "." in table_name else ".."
+        source_table = f"{quote_identifier(source.connection.config.database)}{schema_separator}{target_table}"
 
-        columns = list(data[0].keys())
-        placeholders = ", ".join(["?" for _ in columns])
-        query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+        query = f"INSERT INTO {target_table} WITH (TABLOCK) SELECT * FROM {source_table}{query_suffix}"
+        rows_inserted = self.execute_non_query(query, params)
+        logger.info(f"Copied {rows_inserted} rows into {table_name} server-side from {source_table}")
+        return rows_inserted
 
+    def bulk_insert(
+        self,
+        table_name: str,
+        columns: List[str],
+        rows: Iterable[Sequence[Any]],
+        batch_size: int = 1000,
+        identity_insert: bool = False,
+    ) -> int:
+        with closing(_prefetch_batches(rows, batch_size)) as batches:
+            first_batch = next(batches, None)
+            if first_batch is None:
+                return 0
+
+            total_inserted = self._insert_batches(table_name, columns, chain([first_batch], batches), identity_insert)
+
+        self.invalidate(table_name)
+        return total_inserted
+
+    def _get_insert_sql(self, table_name: str, columns: Sequence[str]) -> str:
+        key = (table_name, tuple(columns))
+        query = self._insert_sql.get(key)
+        if query is None:
+            placeholders = ", ".join(["?" for _ in columns])
+            column_list = ", ".join(quote_identifier(column) for column in columns)
+            query = f"INSERT INTO {quote_identifier(table_name)} ({column_list}) VALUES ({placeholders})"
+            self._insert_sql[key] = query
+        return query
+
+    def _insert_batches(
+        self, table_name: str, columns: List[str], batches: Iterable[List[Sequence[Any]]], identity_insert: bool
+    ) -> int:
+        query = self._get_insert_sql(table_name, columns)
         total_inserted = 0
 
         with self.connection.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.fast_executemany = True
+            if identity_insert:
+                cursor.execute(f"SET IDENTITY_INSERT {quote_identifier(table_name)} ON")
 
-            for i in range(0, len(data), batch_size):
-                batch = data[i : i + batch_size]
-                values = [tuple(row[col] for col in columns) for row in batch]
-
-                cursor.executemany(query, values)
-                conn.commit()
+            for batch in batches:
+                cursor.executemany(query, batch)
                 total_inserted += len(batch)
 
                 logger.debug(f"Inserted batch of {len(batch)} rows into {table_name}")
 
+            if identity_insert:
+                # Only one table per session may have it on, and this connection goes back to the pool
+                cursor.execute(f"SET IDENTITY_INSERT {quote_identifier(table_name)} OFF")
+            conn.commit()
+
         return total_inserted
@@ -1,18 +1,147 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Set, Tuple, Type, cast
 import logging
-from datetime import datetime, timedelta
+import re
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from itertools import chain
 from .config import TableConfig
-from .database import DatabaseHandler
+from .database import DatabaseHandler, quote_identifier
 
 logger = logging.getLogger(__name__)
 
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+_DATA_COMPRESSION = ("NONE", "ROW", "PAGE")
+# Queue behind running queries instead of blocking everyone behind the switch's schema lock
+_SWITCH_OPTIONS = "WITH (WAIT_AT_LOW_PRIORITY (MAX_DURATION = 5 MINUTES, ABORT_AFTER_WAIT = SELF))"
+_YYYYMMDD = re.compile(r"(\d{4})(\d{2})(\d{2})")
+_PARTITION_FUNCTION_LOCKS: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_PARTITION_FUNCTION_LOCKS_GUARD = threading.Lock()
+
+
+def _q(identifier: str) -> str:
+    parts = identifier.split(".")
+    if not all(_IDENTIFIER.fullmatch(part) for part in parts):
+        raise ValueError(f"Invalid SQL identifier: {identifier!r}")
+    return quote_identifier(identifier)
+
+
+def _to_yyyymmdd(value: Any) -> Optional[int]:
+    if type(value) is int:
+        return value
+    if isinstance(value, date):
+        return value.year * 10000 + value.month * 100 + value.day
+
+    match = _YYYYMMDD.match(str(value))
+    if not match:
+        return None
+
+    year, month, day = (int(part) for part in match.groups())
+    if not (1 <= month <= 12 and 1 <= day <= 31):
+        return None
+    return year * 10000 + month * 100 + day
+
+
+_EXISTING_PARTITIONS_QUERY = """
+        SELECT DISTINCT 
+            o.name as table_name,
+            TRY_CAST(prv.value AS INT) as partition_value
+        FROM sys.partition_schemes ps
+        INNER JOIN sys.partition_functions pf ON ps.function_id = pf.function_id
+        INNER JOIN sys.partition_range_values prv ON pf.function_id = prv.function_id
+        INNER JOIN sys.indexes i ON ps.data_space_id = i.data_space_id
+        INNER JOIN sys.objects o ON i.object_id = o.object_id
+        WHERE pf.type = 'R'
+        AND TRY_CAST(prv.value AS INT) IS NOT NULL
+        """
+
+
+_COLUMNS_QUERY = """
+        SELECT 
+            c.name,
+            QUOTENAME(c.name) as column_name,
+            t.name as type_name,
+            c.max_length,
+            c.precision,
+            c.scale,
+            c.is_nullable,
+            c.collation_name,
+            CAST(ic.seed_value AS NVARCHAR(40)) as identity_seed,
+            CAST(ic.increment_value AS NVARCHAR(40)) as identity_increment,
+            cc.definition as computed_definition,
+            cc.is_persisted,
+            dc.definition as default_definition
+        FROM sys.columns c
+        INNER JOIN sys.types t ON c.user_type_id = t.user_type_id
+        LEFT JOIN sys.identity_columns ic ON ic.object_id = c.object_id AND ic.column_id = c.column_id
+        LEFT JOIN sys.computed_columns cc ON cc.object_id = c.object_id AND cc.column_id = c.column_id
+        LEFT JOIN sys.default_constraints dc ON dc.object_id = c.default_object_id
+        WHERE c.object_id = OBJECT_ID(?)
+        ORDER BY c.column_id
+        """
+
+_LENGTH_TYPES = {"char", "varchar", "binary", "varbinary"}
+_UNICODE_LENGTH_TYPES = {"nchar", "nvarchar"}
+_PRECISION_TYPES = {"decimal", "numeric"}
+_SCALE_TYPES = {"datetime2", "datetimeoffset", "time"}
+
+
+def _column_definition(column: Any) -> str:
+    # SWITCH needs computed columns declared identically; the server fills them, so they are never loaded
+    if column.computed_definition:
+        persisted = (" PERSISTED" if column.is_nullable else " PERSISTED NOT NULL") if column.is_persisted else ""
+        return f"{column.column_name} AS {column.computed_definition}{persisted}"
+
+    column_type = column.type_name
+
+    if column_type in _LENGTH_TYPES or column_type in _UNICODE_LENGTH_TYPES:
+        length = column.max_length
+        if length == -1:
+            column_type += "(MAX)"
+        else:
+            column_type += f"({length // 2 if column_type in _UNICODE_LENGTH_TYPES else length})"
+    elif column_type in _PRECISION_TYPES:
+        column_type += f"({column.precision}, {column.scale})"
+    elif column_type in _SCALE_TYPES:
+        column_type += f"({column.scale})"
+
+    if column.collation_name:
+        column_type += f" COLLATE {column.collation_name}"
+
+    definition = f"{column.column_name} {column_type} {'NULL' if column.is_nullable else 'NOT NULL'}"
+    if column.identity_seed is not None:
+        definition += f" IDENTITY({column.identity_seed}, {column.identity_increment})"
+    if column.default_definition:
+        definition += f" DEFAULT {column.default_definition}"
+    return definition
+
+
+def load_existing_partitions(target_handler: DatabaseHandler) -> Dict[str, Set[int]]:
+    # TRY_CAST skips boundaries of date- or datetime-ranged functions instead of failing the whole preload
+    results = target_handler.execute_query_rows(_EXISTING_PARTITIONS_QUERY)
+
+    existing_partitions: Dict[str, Set[int]] = {}
+    for row in results:
+        existing_partitions.setdefault(row.table_name, set()).add(row.partition_value)
+    return existing_partitions
+
 
 class RefreshStrategy(ABC):
-    def __init__(self, source_handler: DatabaseHandler, target_handler: DatabaseHandler, table_config: TableConfig):
+    def __init__(
+        self,
+        source_handler: DatabaseHandler,
+        target_handler: DatabaseHandler,
+        table_config: TableConfig,
+        existing_partitions: Optional[Dict[str, Set[int]]] = None,
+    ):
         self.source_handler = source_handler
         self.target_handler = target_handler
         self.table_config = table_config
+        self.existing_partitions = existing_partitions
+        self._qname = _q(table_config.name)
+        self._qcolumn = _q(table_config.incremental_column) if table_config.incremental_column else None
+        self._select_all_sql = f"SELECT * FROM {self._qname}"
 
     @abstractmethod
     def refresh_table(self) -> Dict[str, Any]:
@@ -38,18 +167,17 @@ class SimpleCopyStrategy(RefreshStrategy):
         if self.table_config.truncate_target:
             self.target_handler.truncate_table(self.table_config.name)
 
-        query = f"SELECT * FROM {self.table_config.name}"
+        query_suffix = ""
         if self.table_config.row_limit:
-            query += f" ORDER BY 1 OFFSET 0 ROWS FETCH NEXT {self.table_config.row_limit} ROWS ONLY"
+            query_suffix = f" ORDER BY 1 OFFSET 0 ROWS FETCH NEXT {self.table_config.row_limit} ROWS ONLY"
 
-        source_data = self.source_handler.execute_query(query)
-
-        if source_data:
+        if self._use_server_side_copy():
+            rows_inserted = self.target_handler.copy_from(self.source_handler, self.table_config.name, query_suffix)
+        else:
+            columns, rows = self.source_handler.execute_query_columnar(self._select_all_sql + query_suffix)
             rows_inserted = self.target_handler.bulk_insert(
-                self.table_config.name, source_data, self.table_config.batch_size or 5000
+                self.table_config.name, columns, rows, self.table_config.batch_size or 5000
             )
-        else:
-            rows_inserted = 0
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -67,24 +195,26 @@ class SimpleCopyStrategy(RefreshStrategy):
 
     def _incremental_refresh(self) -> Dict[str, Any]:
         start_time = datetime.now()
-
         max_value = self.target_handler.get_max_value(self.table_config.name, self.table_config.incremental_column)
+        return self._incremental_refresh_from(max_value, start_time)
 
+    def _incremental_refresh_from(self, max_value: Any, start_time: datetime) -> Dict[str, Any]:
         if max_value is None:
             logger.info(f"No existing data found, performing full refresh for {self.table_config.name}")
             return self._full_refresh()
 
-        where_clause = self._build_incremental_where_clause(max_value)
-        query = f"SELECT * FROM {self.table_config.name} WHERE {where_clause}"
-
-        source_data = self.source_handler.execute_query(query)
+        where_clause, params = self._build_incremental_where_clause(max_value)
 
-        if source_data:
-            rows_inserted = self.target_handler.bulk_insert(
-                self.table_config.name, source_data, self.table_config.batch_size or 5000
+        if self._use_server_side_copy():
+            rows_inserted = self.target_handler.copy_from(
+                self.source_handler, self.table_config.name, f" WHERE {where_clause}", params
             )
         else:
-            rows_inserted = 0
+            query = f"{self._select_all_sql} WHERE {where_clause}"
+            columns, rows = self.source_handler.execute_query_columnar(query, params)
+            rows_inserted = self.target_handler.bulk_insert(
+                self.table_config.name, columns, rows, self.table_config.batch_size or 5000
+            )
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -102,7 +232,17 @@ class SimpleCopyStrategy(RefreshStrategy):
         }
 
     def _smart_sync(self) -> Dict[str, Any]:
-        target_count = self.target_handler.get_table_count(self.table_config.name)
+        start_time = datetime.now()
+
+        if self.table_config.incremental_column:
+            target_count, max_value = self.target_handler.get_sync_state(
+                self.table_config.name, self.table_config.incremental_column
+            )
+            if target_count and self._source_matches_target(target_count, max_value):
+                logger.info(f"Source and target agree for {self.table_config.name}, skipping refresh")
+                return self._unchanged_result(start_time)
+        else:
+            target_count = self.target_handler.get_table_count(self.table_config.name)
 
         if target_count == 0:
             logger.info(f"Target table {self.table_config.name} is empty, performing full refresh")
@@ -113,32 +253,67 @@ class SimpleCopyStrategy(RefreshStrategy):
             logger.info(
                 f"Target table {self.table_config.name} has {target_count} rows, performing incremental refresh"
             )
-            result = self._incremental_refresh()
+            if self.table_config.incremental_column:
+                result = self._incremental_refresh_from(max_value, start_time)
+            else:
+                result = self._incremental_refresh()
             result["sync_mode"] = "smart_sync_incremental"
             return result
 
-    def _build_incremental_where_clause(self, max_value: Any) -> str:
-        column = self.table_config.incremental_column
+    def _use_server_side_copy(self) -> bool:
+        return self.table_config.server_side_copy and self.source_handler.is_same_server(self.target_handler)
 
-        if self.table_config.incremental_type == "identity":
-            return f"{column} > {max_value}"
-        elif self.table_config.incremental_type == "date":
-            if self.table_config.date_buffer_days > 0:
-                buffer_date = max_value - timedelta(days=self.table_config.date_buffer_days)
-                return f"{column} >= '{buffer_date}'"
-            else:
-                return f"{column} > '{max_value}'"
-        elif self.table_config.incremental_type == "datetime":
-            if self.table_config.date_buffer_days > 0:
-                buffer_datetime = max_value - timedelta(days=self.table_config.date_buffer_days)
-                return f"{column} >= '{buffer_datetime}'"
-            else:
-                return f"{column} > '{max_value}'"
-        else:
-            return f"{column} > '{max_value}'"
+    def _source_matches_target(self, target_count: int, target_max: Any) -> bool:
+        # A date buffer exists to pick up updated rows, which matching counts and max values cannot rule out
+        if self.table_config.date_buffer_days > 0:
+            return False
+
+        source_count, source_max = self.source_handler.get_sync_state(
+            self.table_config.name, self.table_config.incremental_column
+        )
+        return source_count == target_count and source_max == target_max
+
+    def _unchanged_result(self, start_time: datetime) -> Dict[str, Any]:
+        end_time = datetime.now()
+        return {
+            "table_name": self.table_config.name,
+            "strategy": "simple_copy",
+            "sync_mode": "smart_sync_noop",
+            "rows_processed": 0,
+            "duration_seconds": (end_time - start_time).total_seconds(),
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+            "status": "success",
+        }
+
+    def _build_incremental_where_clause(self, max_value: Any) -> Tuple[str, tuple]:
+        column = self._qcolumn
+
+        if self.table_config.incremental_type in ("date", "datetime") and self.table_config.date_buffer_days > 0:
+            buffer_value = max_value - timedelta(days=self.table_config.date_buffer_days)
+            return f"{column} >= ?", (buffer_value,)
+
+        return f"{column} > ?", (max_value,)
 
 
 class StagingPartitionSwitchStrategy(RefreshStrategy):
+    def __init__(
+        self,
+        source_handler: DatabaseHandler,
+        target_handler: DatabaseHandler,
+        table_config: TableConfig,
+        existing_partitions: Optional[Dict[str, Set[int]]] = None,
+    ):
+        super().__init__(source_handler, target_handler, table_config, existing_partitions)
+        self._column_definitions: Optional[str] = None
+        self._computed_columns: Set[str] = set()
+        self._has_identity = False
+
+        compression = (table_config.data_compression or "").upper()
+        if compression and compression not in _DATA_COMPRESSION:
+            raise ValueError(f"Unsupported data compression: {table_config.data_compression}")
+        self._compression_option = f"DATA_COMPRESSION = {compression}" if compression else None
+
     def refresh_table(self) -> Dict[str, Any]:
         logger.info(f"Starting staging partition switch refresh for table {self.table_config.name}")
 
@@ -148,25 +323,37 @@ class StagingPartitionSwitchStrategy(RefreshStrategy):
 
         try:
             if self.table_config.sync_mode == "incremental":
-                data = self._get_incremental_data()
+                columns, rows = self._get_incremental_data()
             else:
-                data = self._get_full_data()
+                columns, rows = self._get_full_data()
 
-            if data:
-                required_partitions = self._get_required_partitions(data)
-                partitions_created = self._ensure_partitions_exist(required_partitions)
+            rows = iter(rows)
+            first_row = next(rows, None)
 
+            if first_row is not None:
                 self._create_staging_table(staging_table)
 
+                load_columns, load_rows = self._without_computed_columns(columns, chain([first_row], rows))
                 rows_inserted = self.target_handler.bulk_insert(
-                    staging_table, data, self.table_config.batch_size or 10000
+                    staging_table,
+                    load_columns,
+                    load_rows,
+                    self.table_config.batch_size or 10000,
+                    identity_insert=self._has_identity,
                 )
             else:
                 rows_inserted = 0
 
             if rows_inserted > 0:
+                # The switch needs the indexes anyway; building them first lets the DISTINCT use them
                 self._apply_indexes_and_constraints(staging_table)
-                self._switch_partitions(staging_table, required_partitions)
+                required_partitions = self._distinct_partitions_from_staging(staging_table)
+
+                # Index failures are only logged, so they stay out of the transaction that makes the switch atomic.
+                # Tables sharing a partition function must not interleave their check-then-split
+                with self._partition_function_lock(), self.target_handler.transaction():
+                    partitions_created = self._ensure_partitions_exist(required_partitions)
+                    self._switch_partitions(staging_table, required_partitions)
 
             self._cleanup_staging(staging_table)
 
@@ -191,73 +378,101 @@ class StagingPartitionSwitchStrategy(RefreshStrategy):
             raise
 
     def _create_staging_table(self, staging_table: str) -> None:
-        create_query = f"""
-        SELECT TOP 0 * 
-        INTO {staging_table} 
-        FROM {self.table_config.name}
-        """
-        self.target_handler.execute_non_query(create_query)
+        self._create_table_like_target(staging_table)
         logger.debug(f"Created staging table {staging_table}")
 
-    def _get_incremental_data(self) -> List[Dict[str, Any]]:
+    def _create_table_like_target(self, table_name: str) -> None:
+        if self._column_definitions is None:
+            columns = self.target_handler.execute_query_rows(_COLUMNS_QUERY, (self.table_config.name,))
+            if not columns:
+                raise ValueError(f"Could not read column definitions for {self.table_config.name}")
+            self._column_definitions = ", ".join(_column_definition(column) for column in columns)
+            self._computed_columns = {column.name for column in columns if column.computed_definition}
+            self._has_identity = any(column.identity_seed is not None for column in columns)
+
+        create_query = f"CREATE TABLE {_q(table_name)} ({self._column_definitions})"
+        if self._compression_option:
+            create_query += f" WITH ({self._compression_option})"
+
+        self.target_handler.execute_non_query(create_query)
+
+    def _without_computed_columns(
+        self, columns: List[str], rows: Iterable[Sequence[Any]]
+    ) -> Tuple[List[str], Iterable[Sequence[Any]]]:
+        if not self._computed_columns:
+            return columns, rows
+
+        keep = [i for i, column in enumerate(columns) if column not in self._computed_columns]
+        return [columns[i] for i in keep], (tuple(row[i] for i in keep) for row in rows)
+
+    def _get_incremental_data(self) -> Tuple[List[str], Iterator[Sequence[Any]]]:
         max_value = self.target_handler.get_max_value(self.table_config.name, self.table_config.incremental_column)
 
         if max_value is None:
             return self._get_full_data()
 
         simple_strategy = SimpleCopyStrategy(self.source_handler, self.target_handler, self.table_config)
-        where_clause = simple_strategy._build_incremental_where_clause(max_value)
-        query = f"SELECT * FROM {self.table_config.name} WHERE {where_clause}"
+        where_clause, params = simple_strategy._build_incremental_where_clause(max_value)
+        query = f"{self._select_all_sql} WHERE {where_clause}"
 
-        return self.source_handler.execute_query(query)
+        return self.source_handler.execute_query_columnar(query, params)
 
-    def _get_full_data(self) -> List[Dict[str, Any]]:
-        query = f"SELECT * FROM {self.table_config.name}"
-        return self.source_handler.execute_query(query)
+    def _get_full_data(self) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+        return self.source_handler.execute_query_columnar(self._select_all_sql)
 
-    def _get_required_partitions(self, data: List[Dict[str, Any]]) -> List[int]:
-        if not data or not self.table_config.incremental_column:
+    def _distinct_partitions_from_staging(self, staging_table: str) -> List[int]:
+        # The rows are already on the server, so let it work out the distinct partition keys
+        if not self._qcolumn:
             return []
 
-        partition_column = self.table_config.incremental_column
+        partition_key = self._qcolumn
+        if self.table_config.incremental_type in ("date", "datetime"):
+            partition_key = f"CAST({partition_key} AS date)"
+
+        query = f"""
+        SELECT DISTINCT {partition_key} as partition_value
+        FROM {_q(staging_table)}
+        WHERE {self._qcolumn} IS NOT NULL
+        """
+
+        results = self.target_handler.execute_query_rows(query)
+        return self._to_partition_dates(row.partition_value for row in results)
+
+    def _to_partition_dates(self, values: Iterable[Any]) -> List[int]:
+        distinct_values = {value for value in values if value}
+        if all(type(value) is int for value in distinct_values):
+            return sorted(distinct_values)
+
         partition_dates = set()
+        unparsed = []
+        for value in distinct_values:
+            key = _to_yyyymmdd(value)
+            if key is None:
+                unparsed.append(value)
+            else:
+                partition_dates.add(key)
 
-        for row in data:
-            date_value = row.get(partition_column)
-            if date_value:
-                if isinstance(date_value, datetime):
-                    partition_date = int(date_value.strftime("%Y%m%d"))
-                elif isinstance(date_value, int):
-                    partition_date = date_value
-                else:
-                    try:
-                        parsed_date = datetime.strptime(str(date_value)[:8], "%Y%m%d")
-                        partition_date = int(parsed_date.strftime("%Y%m%d"))
-                    except ValueError:
-                        logger.warning(f"Could not parse partition date from: {date_value}")
-                        continue
-
-                partition_dates.add(partition_date)
-
-        return sorted(list(partition_dates))
+        if unparsed:
+            logger.warning(
+                f"Could not parse partition date from {len(unparsed)} distinct value(s), e.g. {unparsed[0]!r}"
+            )
+
+        return sorted(partition_dates)
 
     def _get_existing_partitions(self) -> List[int]:
-        query = f"""
-        SELECT DISTINCT 
-            CAST(prv.value AS INT) as partition_value
-        FROM sys.partition_schemes ps
-        INNER JOIN sys.partition_functions pf ON ps.function_id = pf.function_id
-        INNER JOIN sys.partition_range_values prv ON pf.function_id = prv.function_id
-        INNER JOIN sys.indexes i ON ps.data_space_id = i.data_space_id
-        INNER JOIN sys.objects o ON i.object_id = o.object_id
-        WHERE o.name = '{self.table_config.name}'
-        AND pf.type = 'R'
+        # Single lookup: another worker may clear the shared cache between a membership check and a read
+        cached = self.existing_partitions.get(self.table_config.name) if self.existing_partitions is not None else None
+        if cached is not None:
+            return sorted(cached)
+
+        query = _EXISTING_PARTITIONS_QUERY + """
+        AND o.name = ?
         ORDER BY partition_value
         """
 
         try:
-            results = self.target_handler.execute_query(query)
-            return [row["partition_value"] for row in results]
+            results = self.target_handler.execute_query_rows(query, (self.table_config.name,))
+            return [row.partition_value for row in results]
         except Exception as e:
             logger.warning(f"Could not retrieve existing partitions for {self.table_config.name}: {e}")
             return []
@@ -266,60 +481,70 @@ class StagingPartitionSwitchStrategy(RefreshStrategy):
         if not required_partitions:
             return []
 
-        existing_partitions = self._get_existing_partitions()
-        missing_partitions = [p for p in required_partitions if p not in existing_partitions]
+        existing_partitions = set(self._get_existing_partitions())
+        missing_partitions = sorted(set(required_partitions) - existing_partitions)
 
-        partitions_created = []
+        if not missing_partitions:
+            return []
 
-        for partition_date in missing_partitions:
-            try:
-                self._create_partition(partition_date)
-                partitions_created.append(partition_date)
-                logger.info(f"Created partition for date {partition_date} on table {self.table_config.name}")
-            except Exception as e:
-                logger.error(f"Failed to create partition for date {partition_date}: {e}")
-                raise
+        try:
+            self._create_partitions(missing_partitions)
+        except Exception as e:
+            logger.error(f"Failed to create partitions for dates {missing_partitions}: {e}")
+            raise
 
-        return partitions_created
+        logger.info(f"Created partitions for dates {missing_partitions} on table {self.table_config.name}")
+        return missing_partitions
 
     def _create_partition(self, partition_date: int) -> None:
-        partition_function_name = self.table_config.partition_function or f"pf_{self.table_config.name}"
+        self._create_partitions([partition_date])
 
-        split_query = f"""
-        ALTER PARTITION FUNCTION {partition_function_name}()
-        SPLIT RANGE ({partition_date})
-        """
+    def _create_partitions(self, partition_dates: List[int]) -> None:
+        partition_function_name = self._partition_function()
+
+        # One round trip for all boundaries; the caller's target_handler.transaction() owns the commit
+        split_query = "".join(
+            f"ALTER PARTITION FUNCTION {partition_function_name}() SPLIT RANGE ({partition_date});\n"
+            for partition_date in partition_dates
+        )
 
         self.target_handler.execute_non_query(split_query)
-        logger.debug(f"Created partition boundary at {partition_date}")
+        logger.debug(f"Created partition boundaries at {partition_dates}")
+
+        if self.existing_partitions is not None:
+            # Other tables may share the partition function, so none of the cached boundaries can be trusted
+            self.existing_partitions.clear()
 
     def _apply_indexes_and_constraints(self, staging_table: str) -> None:
-        indexes_query = f"""
+        indexes_query = """
         SELECT 
             i.name as index_name,
             i.type_desc,
             i.is_unique,
-            STRING_AGG(c.name, ', ') WITHIN GROUP (ORDER BY ic.key_ordinal) as columns
+            STRING_AGG(QUOTENAME(c.name), ', ') WITHIN GROUP (ORDER BY ic.key_ordinal) as columns
         FROM sys.indexes i
         INNER JOIN sys.index_columns ic ON i.object_id = ic.object_id AND i.index_id = ic.index_id
         INNER JOIN sys.columns c ON ic.object_id = c.object_id AND ic.column_id = c.column_id
         INNER JOIN sys.objects o ON i.object_id = o.object_id
-        WHERE o.name = '{self.table_config.name}'
+        WHERE o.name = ?
         AND i.type > 0
         GROUP BY i.name, i.type_desc, i.is_unique, i.index_id
         ORDER BY i.index_id
         """
 
         try:
-            indexes = self.target_handler.execute_query(indexes_query)
+            indexes = self.target_handler.execute_query_rows(indexes_query, (self.table_config.name,))
 
             for index in indexes:
-                index_type = "UNIQUE" if index["is_unique"] else ""
-                index_name = f"{index['index_name']}_staging"
+                index_type = "UNIQUE" if index.is_unique else ""
+                index_name = f"{index.index_name}_staging"
+
+                index_options = ", ".join(filter(None, ["SORT_IN_TEMPDB = ON", self._compression_option]))
 
                 create_index_query = f"""
                 CREATE {index_type} INDEX {index_name} 
-                ON {staging_table} ({index['columns']})
+                ON {_q(staging_table)} ({index.columns})
+                WITH ({index_options})
                 """
 
                 self.target_handler.execute_non_query(create_index_query)
@@ -337,21 +562,24 @@ class StagingPartitionSwitchStrategy(RefreshStrategy):
             try:
                 partition_number = self._get_partition_number(partition_date)
 
-                temp_table = f"{self.table_config.name}_temp_{partition_date}"
+                temp_table_name = f"{self.table_config.name}_temp_{partition_date}"
+                temp_table = _q(temp_table_name)
 
                 switch_out_query = f"""
-                ALTER TABLE {self.table_config.name} 
+                ALTER TABLE {self._qname} 
                 SWITCH PARTITION {partition_number} TO {temp_table}
+                {_SWITCH_OPTIONS}
                 """
 
                 switch_in_query = f"""
-                ALTER TABLE {staging_table} 
-                SWITCH PARTITION {partition_number} TO {self.table_config.name} PARTITION {partition_number}
+                ALTER TABLE {_q(staging_table)} 
+                SWITCH PARTITION {partition_number} TO {self._qname} PARTITION {partition_number}
+                {_SWITCH_OPTIONS}
                 """
 
                 drop_temp_query = f"DROP TABLE IF EXISTS {temp_table}"
 
-                self.target_handler.execute_non_query(f"SELECT TOP 0 * INTO {temp_table} FROM {self.table_config.name}")
+                self._create_table_like_target(temp_table_name)
                 self.target_handler.execute_non_query(switch_out_query)
                 self.target_handler.execute_non_query(switch_in_query)
                 self.target_handler.execute_non_query(drop_temp_query)
@@ -362,35 +590,55 @@ class StagingPartitionSwitchStrategy(RefreshStrategy):
                 logger.error(f"Failed to switch partition for date {partition_date}: {e}")
                 raise
 
+    def _partition_function(self) -> str:
+        return _q(self.table_config.partition_function or f"pf_{self.table_config.name}")
+
+    def _partition_function_lock(self) -> threading.Lock:
+        with _PARTITION_FUNCTION_LOCKS_GUARD:
+            return _PARTITION_FUNCTION_LOCKS[self._partition_function()]
+
     def _get_partition_number(self, partition_date: int) -> int:
-        partition_function_name = self.table_config.partition_function or f"pf_{self.table_config.name}"
+        partition_function_name = self._partition_function()
 
         query = f"""
         SELECT 
-            $PARTITION.{partition_function_name}({partition_date}) as partition_number
+            $PARTITION.{partition_function_name}(?) as partition_number
         """
 
-        result = self.target_handler.execute_query(query)
+        result = self.target_handler.execute_query_rows(query, (partition_date,))
         if result:
-            return result[0]["partition_number"]
+            return cast(int, result[0].partition_number)
         else:
             raise ValueError(f"Could not determine partition number for date {partition_date}")
 
     def _cleanup_staging(self, staging_table: str) -> None:
         try:
-            drop_query = f"DROP TABLE IF EXISTS {staging_table}"
+            drop_query = f"DROP TABLE IF EXISTS {_q(staging_table)}"
             self.target_handler.execute_non_query(drop_query)
             logger.debug(f"Cleaned up staging table {staging_table}")
         except Exception as e:
             logger.warning(f"Failed to cleanup staging table {staging_table}: {e}")
 
 
+_STRATEGIES: Dict[str, Type[RefreshStrategy]] = {
+    "simple_copy": SimpleCopyStrategy,
+    "staging_partition_switch": StagingPartitionSwitchStrategy,
+}
+
+
+def register_strategy(name: str, strategy_class: Type[RefreshStrategy]) -> None:
+    _STRATEGIES[name] = strategy_class
+
+
 def get_strategy(
-    source_handler: DatabaseHandler, target_handler: DatabaseHandler, table_config: TableConfig
+    source_handler: DatabaseHandler,
+    target_handler: DatabaseHandler,
+    table_config: TableConfig,
+    existing_partitions: Optional[Dict[str, Set[int]]] = None,
 ) -> RefreshStrategy:
-    if table_config.strategy == "simple_copy":
-        return SimpleCopyStrategy(source_handler, target_handler, table_config)
-    elif table_config.strategy == "staging_partition_switch":
-        return StagingPartitionSwitchStrategy(source_handler, target_handler, table_config)
-    else:
-        raise ValueError(f"Unknown strategy: {table_config.strategy}")
+    try:
+        strategy_class = _STRATEGIES[table_config.strategy]
+    except KeyError:
+        raise ValueError(f"Unknown strategy: {table_config.strategy}") from None
+
+    return strategy_class(source_handler, target_handler, table_config, existing_partitions)
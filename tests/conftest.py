@@ -1,26 +1,94 @@
-import pytest
+import functools
 import os
-from unittest.mock import patch
+import sys
+import pytest
+import yaml
+from unittest.mock import MagicMock, Mock, patch
+
+# conftest loads before test collection, so test modules can import src.database at module level
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    sys.modules['pyodbc'] = MagicMock()
+
+try:
+    from yaml import CSafeDumper as _Dumper, CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeDumper as _Dumper, SafeLoader as _Loader
+
+
+def dump_yaml(obj, stream=None):
+    return yaml.dump(obj, stream, Dumper=_Dumper)
 
 
-@pytest.fixture(autouse=True)
-def clean_env():
-    """Clean environment variables before each test"""
-    env_vars = ['SOURCE_DB_USER', 'SOURCE_DB_PASSWORD', 'TARGET_DB_USER', 'TARGET_DB_PASSWORD']
+def load_yaml(stream):
+    return yaml.load(stream, Loader=_Loader)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config_file(path, mtime):
+    with open(path, "r") as file:
+        return load_yaml(file)
+
+
+class _CursorSpec:
+    description = None
+    rowcount = -1
+    fast_executemany = False
+    
+    def execute(self, query, *params):
+        pass
     
-    # Store original values
-    original_values = {var: os.environ.get(var) for var in env_vars}
+    def executemany(self, query, params):
+        pass
     
-    # Clear environment variables
-    for var in env_vars:
-        if var in os.environ:
-            del os.environ[var]
+    def fetchall(self):
+        pass
     
-    yield
+    def fetchmany(self, size=None):
+        pass
     
-    # Restore original values
-    for var, value in original_values.items():
-        if value is not None:
-            os.environ[var] = value
-        elif var in os.environ:
-            del os.environ[var]
\ No newline at end of file
+    def close(self):
+        pass
+
+
+class _ConnSpec:
+    timeout = 0
+    
+    def cursor(self):
+        pass
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def mock_conn_factory():
+    """Build a mock pyodbc connection whose cursor() returns a preconfigured cursor"""
+    def _make(rowcount=None, description=None, rows=None):
+        cursor = Mock(spec=_CursorSpec, rowcount=rowcount, description=description)
+        cursor.fetchall.return_value = rows or []
+        conn = Mock(spec=_ConnSpec)
+        conn.cursor.return_value = cursor
+        return conn, cursor
+    return _make
+
+
+@pytest.fixture
+def config_manager(config_file):
+    """Fresh ConfigManager per test, parsing each config file only once per mtime"""
+    from src.config import ConfigManager
+    config = _load_config_file(config_file, os.path.getmtime(config_file))
+    return ConfigManager.from_dict(config, config_path=config_file)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def require_libyaml():
+    """Fail fast if PyYAML was built without libyaml"""
+    assert yaml.__with_libyaml__, "PyYAML was built without libyaml; config parsing falls back to pure Python"
\ No newline at end of file
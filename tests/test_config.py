@@ -1,96 +1,78 @@
+import copy
 import pytest
 import os
-import tempfile
-import yaml
 from src.config import ConfigManager, DatabaseConfig, TableConfig, Settings
+from tests.conftest import dump_yaml, load_yaml
+
+
+SAMPLE_CONFIG_YAML = """\
+databases:
+  source:
+    server: source-server
+    database: SourceDB
+    auth_type: windows
+  target:
+    server: target-server
+    database: TargetDB
+    auth_type: sql
+tables:
+  - name: TestTable
+    strategy: simple_copy
+    sync_mode: full_replace
+    truncate_target: true
+  - name: PartitionedTable
+    strategy: staging_partition_switch
+    sync_mode: incremental
+    incremental_column: report_date
+    incremental_type: date
+    partition_function: pf_PartitionedTable
+    partition_scheme: ps_PartitionedTable
+settings:
+  default_batch_size: 1000
+  connection_timeout: 30
+  command_timeout: 300
+  max_retries: 3
+"""
+
+SAMPLE_CONFIG = load_yaml(SAMPLE_CONFIG_YAML)
+
+
+@pytest.fixture(scope="session")
+def sample_config():
+    return SAMPLE_CONFIG
 
 
-@pytest.fixture
-def sample_config():
-    return {
-        "databases": {
-            "source": {
-                "server": "source-server",
-                "database": "SourceDB",
-                "auth_type": "windows"
-            },
-            "target": {
-                "server": "target-server",
-                "database": "TargetDB",
-                "auth_type": "sql"
-            }
-        },
-        "tables": [
-            {
-                "name": "TestTable",
-                "strategy": "simple_copy",
-                "sync_mode": "full_replace",
-                "truncate_target": True
-            },
-            {
-                "name": "PartitionedTable",
-                "strategy": "staging_partition_switch",
-                "sync_mode": "incremental",
-                "incremental_column": "report_date",
-                "incremental_type": "date",
-                "partition_function": "pf_PartitionedTable",
-                "partition_scheme": "ps_PartitionedTable"
-            }
-        ],
-        "settings": {
-            "default_batch_size": 1000,
-            "connection_timeout": 30,
-            "command_timeout": 300,
-            "max_retries": 3
-        }
-    }
-
-
-@pytest.fixture
-def config_file(sample_config):
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-        yaml.dump(sample_config, f)
-        yield f.name
-    os.unlink(f.name)
-
-
-def test_config_manager_initialization(config_file):
-    config_manager = ConfigManager(config_file)
-    assert config_manager.config_path == config_file
+@pytest.fixture(scope="session")
+def config_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("config") / "config.yaml"
+    path.write_text(SAMPLE_CONFIG_YAML)
+    return str(path)
 
 
-def test_get_source_db_config(config_file):
-    os.environ['SOURCE_DB_USER'] = 'test_user'
-    os.environ['SOURCE_DB_PASSWORD'] = 'test_pass'
-    
-    config_manager = ConfigManager(config_file)
-    source_config = config_manager.get_source_db_config()
-    
-    assert isinstance(source_config, DatabaseConfig)
-    assert source_config.server == "source-server"
-    assert source_config.database == "SourceDB"
-    assert source_config.auth_type == "windows"
-    assert source_config.user == "test_user"
-    assert source_config.password == "test_pass"
+def test_config_manager_initialization(config_manager, config_file):
+    assert config_manager.config_path == config_file
 
 
-def test_get_target_db_config(config_file):
-    os.environ['TARGET_DB_USER'] = 'target_user'
-    os.environ['TARGET_DB_PASSWORD'] = 'target_pass'
+@pytest.mark.parametrize("role,server,database,auth_type", [
+    ("source", "source-server", "SourceDB", "windows"),
+    ("target", "target-server", "TargetDB", "sql"),
+])
+def test_get_db_config(monkeypatch, config_manager, role, server, database, auth_type):
+    prefix = role.upper()
+    monkeypatch.setenv(f'{prefix}_DB_USER', f'{role}_user')
+    monkeypatch.setenv(f'{prefix}_DB_PASSWORD', f'{role}_pass')
     
-    config_manager = ConfigManager(config_file)
-    target_config = config_manager.get_target_db_config()
+    db_config = getattr(config_manager, f"get_{role}_db_config")()
     
-    assert isinstance(target_config, DatabaseConfig)
-    assert target_config.server == "target-server"
-    assert target_config.database == "TargetDB"
-    assert target_config.auth_type == "sql"
-    assert target_config.user == "target_user"
-    assert target_config.password == "target_pass"
+    assert isinstance(db_config, DatabaseConfig)
+    assert db_config.server == server
+    assert db_config.database == database
+    assert db_config.auth_type == auth_type
+    assert db_config.user == f"{role}_user"
+    assert db_config.password == f"{role}_pass"
 
 
-def test_get_table_configs(config_file):
-    config_manager = ConfigManager(config_file)
+def test_get_table_configs(config_manager):
     table_configs = config_manager.get_table_configs()
     
     assert len(table_configs) == 2
@@ -113,23 +95,19 @@ def test_get_table_configs(config_file):
     assert table_configs[1].partition_scheme == "ps_PartitionedTable"
 
 
-def test_get_table_config(config_file):
-    config_manager = ConfigManager(config_file)
+def test_get_table_config(config_manager):
     table_config = config_manager.get_table_config("TestTable")
     
     assert isinstance(table_config, TableConfig)
     assert table_config.name == "TestTable"
 
 
-def test_get_table_config_not_found(config_file):
-    config_manager = ConfigManager(config_file)
-    
+def test_get_table_config_not_found(config_manager):
     with pytest.raises(ValueError, match="Table 'NonExistent' not found"):
         config_manager.get_table_config("NonExistent")
 
 
-def test_get_settings(config_file):
-    config_manager = ConfigManager(config_file)
+def test_get_settings(config_manager):
     settings = config_manager.get_settings()
     
     assert isinstance(settings, Settings)
@@ -139,12 +117,115 @@ def test_get_settings(config_file):
     assert settings.max_retries == 3
 
 
-def test_get_partitioned_table_config(config_file):
-    config_manager = ConfigManager(config_file)
+def test_get_partitioned_table_config(config_manager):
     table_config = config_manager.get_table_config("PartitionedTable")
     
     assert isinstance(table_config, TableConfig)
     assert table_config.name == "PartitionedTable"
     assert table_config.strategy == "staging_partition_switch"
     assert table_config.partition_function == "pf_PartitionedTable"
-    assert table_config.partition_scheme == "ps_PartitionedTable"
\ No newline at end of file
+    assert table_config.partition_scheme == "ps_PartitionedTable"
+
+
+def test_config_cache_written(config_file, sample_config):
+    ConfigManager(config_file)
+    
+    assert os.path.exists(f"{config_file}.cache.json")
+    assert ConfigManager(config_file)._config == sample_config
+
+
+def test_config_cache_invalidated_on_change(tmp_path, sample_config):
+    changed_config = copy.deepcopy(sample_config)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(dump_yaml(changed_config))
+    
+    ConfigManager(str(config_file))
+    
+    changed_config["settings"]["default_batch_size"] = 2500
+    config_file.write_text(dump_yaml(changed_config))
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    config_manager = ConfigManager(str(config_file))
+    assert config_manager.get_settings().default_batch_size == 2500
+
+
+def test_config_cache_invalidated_on_same_mtime_edit(tmp_path, sample_config):
+    changed_config = copy.deepcopy(sample_config)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(dump_yaml(changed_config))
+    stat = os.stat(config_file)
+    
+    ConfigManager(str(config_file))
+    
+    changed_config["settings"]["default_batch_size"] = 25000
+    config_file.write_text(dump_yaml(changed_config))
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    
+    config_manager = ConfigManager(str(config_file))
+    assert config_manager.get_settings().default_batch_size == 25000
+
+
+def test_config_cache_skipped_for_non_str_keys(tmp_path, sample_config):
+    config_with_int_keys = dict(copy.deepcopy(sample_config), retention={30: "daily"})
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(dump_yaml(config_with_int_keys))
+    
+    ConfigManager(str(config_file))
+    
+    assert not os.path.exists(f"{config_file}.cache.json")
+    assert ConfigManager(str(config_file))._config["retention"] == {30: "daily"}
+
+
+def test_from_dict_skips_file(sample_config):
+    config_manager = ConfigManager.from_dict(sample_config)
+    
+    assert config_manager.config_path is None
+    assert config_manager.get_table_config("TestTable").strategy == "simple_copy"
+    assert config_manager.get_settings().default_batch_size == 1000
+
+
+def test_accessors_are_cached(config_manager):
+    assert config_manager.get_settings() is config_manager.get_settings()
+    assert config_manager.get_source_db_config() is config_manager.get_source_db_config()
+    assert config_manager.get_target_db_config() is config_manager.get_target_db_config()
+    assert config_manager.get_table_configs() is config_manager.get_table_configs()
+
+
+def test_db_credentials_read_once(monkeypatch, config_manager):
+    monkeypatch.setenv('SOURCE_DB_USER', 'first_user')
+    assert config_manager.get_source_db_config().user == "first_user"
+    
+    monkeypatch.setenv('SOURCE_DB_USER', 'second_user')
+    assert config_manager.get_source_db_config().user == "first_user"
+
+
+def test_table_configs_built_once(config_manager):
+    table_configs = config_manager.get_table_configs()
+    
+    assert isinstance(table_configs, tuple)
+    assert config_manager.get_table_config("TestTable") is table_configs[0]
+    
+    with pytest.raises(AttributeError):
+        table_configs[0].batch_size = 1
+
+
+@pytest.fixture(scope="module")
+def large_config_manager(sample_config):
+    config = dict(sample_config, tables=[
+        {"name": f"Table{i}", "strategy": "simple_copy", "sync_mode": "full_replace"}
+        for i in range(1000)
+    ])
+    return ConfigManager.from_dict(config)
+
+
+@pytest.mark.parametrize("index", [0, 499, 999])
+def test_get_table_config_large_config(large_config_manager, index):
+    table_config = large_config_manager.get_table_config(f"Table{index}")
+    
+    assert table_config is large_config_manager.get_table_configs()[index]
+
+
+def test_get_table_config_not_found_large_config(large_config_manager):
+    with pytest.raises(ValueError, match="Table 'Table1000' not found"):
+        large_config_manager.get_table_config("Table1000")
@@ -1,9 +1,27 @@
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch
 from src.database import DatabaseConnection, DatabaseHandler
 from src.config import DatabaseConfig, Settings
 
 
+_EXPECTED_WINDOWS_CONN = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=test-server;"
+    "DATABASE=TestDB;"
+    "Trusted_Connection=yes;"
+    "Connection Timeout=30;"
+)
+
+_EXPECTED_SQL_CONN = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=test-server;"
+    "DATABASE=TestDB;"
+    "UID=test_user;"
+    "PWD=test_pass;"
+    "Connection Timeout=30;"
+)
+
+
 @pytest.fixture
 def windows_db_config():
     return DatabaseConfig(
@@ -34,40 +52,20 @@ def settings():
     )
 
 
-def test_windows_connection_string(windows_db_config, settings):
-    connection = DatabaseConnection(windows_db_config, settings)
-    
-    expected = (
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=test-server;"
-        "DATABASE=TestDB;"
-        "Trusted_Connection=yes;"
-        "Connection Timeout=30;"
-    )
-    
-    assert connection._connection_string == expected
-
-
-def test_sql_connection_string(sql_db_config, settings):
-    connection = DatabaseConnection(sql_db_config, settings)
-    
-    expected = (
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=test-server;"
-        "DATABASE=TestDB;"
-        "UID=test_user;"
-        "PWD=test_pass;"
-        "Connection Timeout=30;"
-    )
+@pytest.mark.parametrize("auth_type,creds,expected", [
+    ("windows", {}, _EXPECTED_WINDOWS_CONN),
+    ("sql", {"user": "test_user", "password": "test_pass"}, _EXPECTED_SQL_CONN),
+])
+def test_connection_string(auth_type, creds, expected, settings):
+    config = DatabaseConfig(server="test-server", database="TestDB", auth_type=auth_type, **creds)
+    connection = DatabaseConnection(config, settings)
     
     assert connection._connection_string == expected
 
 
 @patch('src.database.pyodbc.connect')
-def test_test_connection_success(mock_connect, windows_db_config, settings):
-    mock_conn = Mock()
-    mock_cursor = Mock()
-    mock_conn.cursor.return_value = mock_cursor
+def test_test_connection_success(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory()
     mock_connect.return_value = mock_conn
     
     connection = DatabaseConnection(windows_db_config, settings)
@@ -89,35 +87,40 @@ def test_test_connection_failure(mock_connect, windows_db_config, settings):
 
 
 @patch('src.database.pyodbc.connect')
-def test_database_handler_execute_query(mock_connect, windows_db_config, settings):
-    mock_conn = Mock()
-    mock_cursor = Mock()
-    mock_conn.cursor.return_value = mock_cursor
+def test_database_handler_execute_query(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(
+        description=[('col1',), ('col2',)], rows=[('val1', 'val2'), ('val3', 'val4')]
+    )
     mock_connect.return_value = mock_conn
     
-    mock_cursor.description = [('col1',), ('col2',)]
-    mock_cursor.fetchall.return_value = [('val1', 'val2'), ('val3', 'val4')]
-    
     connection = DatabaseConnection(windows_db_config, settings)
     handler = DatabaseHandler(connection)
     
     result = handler.execute_query("SELECT * FROM test_table")
     
-    expected = [
-        {'col1': 'val1', 'col2': 'val2'},
-        {'col1': 'val3', 'col2': 'val4'}
-    ]
-    
-    assert result == expected
+    assert result.columns == ('col1', 'col2')
+    assert result.rows == [('val1', 'val2'), ('val3', 'val4')]
     mock_cursor.execute.assert_called_once_with("SELECT * FROM test_table", ())
 
 
 @patch('src.database.pyodbc.connect')
-def test_database_handler_execute_non_query(mock_connect, windows_db_config, settings):
-    mock_conn = Mock()
-    mock_cursor = Mock()
-    mock_cursor.rowcount = 5
-    mock_conn.cursor.return_value = mock_cursor
+def test_database_handler_execute_query_rows(mock_connect, windows_db_config, settings, mock_conn_factory):
+    rows = [('val1', 'val2'), ('val3', 'val4')]
+    mock_conn, mock_cursor = mock_conn_factory(rows=rows)
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    result = handler.execute_query_rows("SELECT * FROM test_table WHERE id = ?", (1,))
+    
+    assert result is rows
+    mock_cursor.execute.assert_called_once_with("SELECT * FROM test_table WHERE id = ?", (1,))
+
+
+@patch('src.database.pyodbc.connect')
+def test_database_handler_execute_non_query(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(rowcount=5)
     mock_connect.return_value = mock_conn
     
     connection = DatabaseConnection(windows_db_config, settings)
@@ -131,38 +134,358 @@ def test_database_handler_execute_non_query(mock_connect, windows_db_config, set
 
 
 @patch('src.database.pyodbc.connect')
-def test_get_max_value(mock_connect, windows_db_config, settings):
-    mock_conn = Mock()
-    mock_cursor = Mock()
-    mock_conn.cursor.return_value = mock_cursor
+def test_get_max_value(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(description=[('max_value',)], rows=[(100,)])
     mock_connect.return_value = mock_conn
     
-    mock_cursor.description = [('max_value',)]
-    mock_cursor.fetchall.return_value = [(100,)]
-    
     connection = DatabaseConnection(windows_db_config, settings)
     handler = DatabaseHandler(connection)
     
     result = handler.get_max_value("test_table", "id")
     
     assert result == 100
-    mock_cursor.execute.assert_called_once_with("SELECT MAX(id) as max_value FROM test_table", ())
+    mock_cursor.execute.assert_called_once_with("SELECT MAX([id]) as max_value FROM [test_table]", ())
 
 
 @patch('src.database.pyodbc.connect')
-def test_get_table_count(mock_connect, windows_db_config, settings):
-    mock_conn = Mock()
-    mock_cursor = Mock()
-    mock_conn.cursor.return_value = mock_cursor
+def test_get_table_count(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(description=[('count',)], rows=[(50,)])
     mock_connect.return_value = mock_conn
     
-    mock_cursor.description = [('count',)]
-    mock_cursor.fetchall.return_value = [(50,)]
-    
     connection = DatabaseConnection(windows_db_config, settings)
     handler = DatabaseHandler(connection)
     
     result = handler.get_table_count("test_table")
     
     assert result == 50
-    mock_cursor.execute.assert_called_once_with("SELECT COUNT(*) as count FROM test_table", ())
\ No newline at end of file
+    mock_cursor.execute.assert_called_once_with("SELECT COUNT(*) as count FROM [test_table]", ())
+
+
+@patch('src.database.pyodbc.connect')
+def test_database_handler_execute_query_columnar(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(description=[('col1',), ('col2',)])
+    mock_connect.return_value = mock_conn
+    
+    mock_cursor.fetchmany.side_effect = [[('val1', 'val2')], [('val3', 'val4')], []]
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    columns, rows = handler.execute_query_columnar("SELECT * FROM test_table", arraysize=1)
+    
+    assert columns == ['col1', 'col2']
+    mock_cursor.execute.assert_called_once_with("SELECT * FROM test_table", ())
+    mock_cursor.fetchmany.assert_not_called()
+    
+    assert list(rows) == [('val1', 'val2'), ('val3', 'val4')]
+    mock_cursor.fetchmany.assert_called_with(1)
+    assert connection._pool.qsize() == 1
+
+
+@patch('src.database.pyodbc.connect')
+def test_bulk_insert_consumes_iterator_in_batches(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory()
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    rows = ((i, f"Test{i}") for i in range(5))
+    result = handler.bulk_insert("test_table", ['id', 'name'], rows, batch_size=2)
+    
+    assert result == 5
+    assert mock_cursor.fast_executemany is True
+    assert mock_cursor.executemany.call_count == 3
+    mock_cursor.executemany.assert_called_with("INSERT INTO [test_table] ([id], [name]) VALUES (?, ?)", [(4, 'Test4')])
+    mock_conn.commit.assert_called_once()
+
+
+@patch('src.database.pyodbc.connect')
+def test_bulk_insert_identity_insert(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory()
+    mock_connect.return_value = mock_conn
+    
+    handler = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    handler.bulk_insert("test_table", ['id'], [(1,), (2,)], identity_insert=True)
+    
+    assert [c[0][0] for c in mock_cursor.execute.call_args_list] == [
+        "SET IDENTITY_INSERT [test_table] ON",
+        "SET IDENTITY_INSERT [test_table] OFF"
+    ]
+    mock_cursor.executemany.assert_called_once_with("INSERT INTO [test_table] ([id]) VALUES (?)", [(1,), (2,)])
+
+
+@patch('src.database.pyodbc.connect')
+def test_bulk_insert_source_error_propagates(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, _ = mock_conn_factory()
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    def rows():
+        yield (1, 'Test1')
+        yield (2, 'Test2')
+        raise RuntimeError("source connection lost")
+    
+    with pytest.raises(RuntimeError, match="source connection lost"):
+        handler.bulk_insert("test_table", ['id', 'name'], rows(), batch_size=1)
+    
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called()
+
+
+@patch('src.database.pyodbc.connect')
+def test_bulk_insert_failure_closes_source(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory()
+    mock_cursor.executemany.side_effect = Exception("insert failed")
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    closed = []
+    
+    def rows():
+        try:
+            for i in range(100):
+                yield (i, f"Test{i}")
+        finally:
+            closed.append(True)
+    
+    with pytest.raises(Exception, match="insert failed"):
+        handler.bulk_insert("test_table", ['id', 'name'], rows(), batch_size=2)
+    
+    assert closed == [True]
+
+
+def test_insert_sql_cached_per_table_and_columns(windows_db_config, settings):
+    handler = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    
+    query = handler._get_insert_sql("test_table", ['id', 'name'])
+    
+    assert query == "INSERT INTO [test_table] ([id], [name]) VALUES (?, ?)"
+    assert handler._get_insert_sql("test_table", ('id', 'name')) is query
+    assert handler._get_insert_sql("test_table", ['id']) == "INSERT INTO [test_table] ([id]) VALUES (?)"
+
+
+def test_insert_sql_quotes_awkward_identifiers(windows_db_config, settings):
+    handler = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    
+    query = handler._get_insert_sql("dbo.test_table", ['order', 'unit price', 'odd]name'])
+    
+    assert query == "INSERT INTO [dbo].[test_table] ([order], [unit price], [odd]]name]) VALUES (?, ?, ?)"
+
+
+@patch('src.database.pyodbc.connect')
+def test_bulk_insert_empty_iterator(mock_connect, windows_db_config, settings):
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    assert handler.bulk_insert("test_table", ['id'], iter([])) == 0
+    mock_connect.assert_not_called()
+
+
+def test_is_same_server(windows_db_config, sql_db_config, settings):
+    source = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    target = DatabaseHandler(DatabaseConnection(sql_db_config, settings))
+    other = DatabaseHandler(DatabaseConnection(
+        DatabaseConfig(server="other-server", database="TestDB", auth_type="windows"), settings
+    ))
+    
+    assert source.is_same_server(target) is True
+    assert source.is_same_server(other) is False
+
+
+@patch('src.database.pyodbc.connect')
+def test_copy_from_runs_server_side(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(rowcount=42)
+    mock_connect.return_value = mock_conn
+    
+    source = DatabaseHandler(DatabaseConnection(
+        DatabaseConfig(server="test-server", database="SourceDB", auth_type="windows"), settings
+    ))
+    target = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    
+    result = target.copy_from(source, "test_table")
+    
+    assert result == 42
+    mock_cursor.execute.assert_called_once_with(
+        "INSERT INTO [test_table] WITH (TABLOCK) SELECT * FROM [SourceDB]..[test_table]", ()
+    )
+    
+    target.copy_from(source, "dbo.test_table", " WHERE [id] > ?", (5,))
+    mock_cursor.execute.assert_called_with(
+        "INSERT INTO [dbo].[test_table] WITH (TABLOCK) SELECT * FROM [SourceDB].[dbo].[test_table] WHERE [id] > ?", (5,)
+    )
+
+
+@patch('src.database.pyodbc.connect')
+def test_copy_from_escapes_source_database(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(rowcount=0)
+    mock_connect.return_value = mock_conn
+    
+    source = DatabaseHandler(DatabaseConnection(
+        DatabaseConfig(server="test-server", database="Source]DB", auth_type="windows"), settings
+    ))
+    target = DatabaseHandler(DatabaseConnection(windows_db_config, settings))
+    
+    target.copy_from(source, "test_table")
+    
+    mock_cursor.execute.assert_called_once_with(
+        "INSERT INTO [test_table] WITH (TABLOCK) SELECT * FROM [Source]]DB]..[test_table]", ()
+    )
+
+
+@patch('src.database.pyodbc.connect')
+def test_connection_reused_from_pool(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, _ = mock_conn_factory()
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    handler.execute_non_query("DELETE FROM test_table")
+    handler.execute_non_query("DELETE FROM test_table")
+    
+    mock_connect.assert_called_once()
+    mock_conn.close.assert_not_called()
+
+
+@patch('src.database.pyodbc.connect')
+def test_failed_connection_not_returned_to_pool(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory()
+    mock_cursor.execute.side_effect = Exception("Query failed")
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    with pytest.raises(Exception, match="Query failed"):
+        handler.execute_non_query("DELETE FROM test_table")
+    
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+    assert connection._pool.qsize() == 0
+
+
+@patch('src.database.pyodbc.connect')
+def test_release_skips_rollback(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, _ = mock_conn_factory(rowcount=3)
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    assert handler.execute_non_query("DELETE FROM test_table") == 3
+    
+    mock_conn.commit.assert_called_once()
+    mock_conn.rollback.assert_not_called()
+    assert connection._pool.qsize() == 1
+
+
+@patch('src.database.time.monotonic')
+@patch('src.database.pyodbc.connect')
+def test_stale_idle_connection_replaced(mock_connect, mock_monotonic, windows_db_config, settings, mock_conn_factory):
+    stale_conn, stale_cursor = mock_conn_factory()
+    fresh_conn, _ = mock_conn_factory()
+    mock_connect.side_effect = [stale_conn, fresh_conn]
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    mock_monotonic.return_value = 0
+    handler.execute_non_query("DELETE FROM test_table")
+    
+    stale_cursor.execute.side_effect = Exception("Communication link failure")
+    mock_monotonic.return_value = 120
+    handler.execute_non_query("DELETE FROM test_table")
+    
+    stale_cursor.execute.assert_called_with("SELECT 1")
+    stale_conn.close.assert_called_once()
+    fresh_conn.commit.assert_called_once()
+    assert mock_connect.call_count == 2
+
+
+@patch('src.database.pyodbc.connect')
+def test_transaction_shares_one_connection_and_commits_once(
+    mock_connect, windows_db_config, settings, mock_conn_factory
+):
+    mock_conn, mock_cursor = mock_conn_factory(rowcount=1, rows=[(3,)])
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    with handler.transaction():
+        handler.execute_non_query("ALTER TABLE a SWITCH PARTITION 3 TO b")
+        assert handler.execute_query_rows("SELECT 3") == [(3,)]
+        handler.execute_non_query("ALTER TABLE c SWITCH PARTITION 3 TO a PARTITION 3")
+        mock_conn.commit.assert_not_called()
+    
+    mock_connect.assert_called_once()
+    mock_conn.commit.assert_called_once()
+    assert mock_cursor.execute.call_count == 3
+
+
+@patch('src.database.pyodbc.connect')
+def test_transaction_rolls_back_on_error(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(rowcount=1)
+    mock_cursor.execute.side_effect = [None, Exception("switch failed")]
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    with pytest.raises(Exception, match="switch failed"):
+        with handler.transaction():
+            handler.execute_non_query("ALTER TABLE a SWITCH PARTITION 3 TO b")
+            handler.execute_non_query("ALTER TABLE c SWITCH PARTITION 3 TO a PARTITION 3")
+    
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    
+    mock_cursor.execute.side_effect = None
+    handler.execute_non_query("DELETE FROM test_table")
+    assert mock_conn.commit.call_count == 1
+
+
+@patch('src.database.pyodbc.connect')
+def test_get_sync_state_probes_count_and_max_together(
+    mock_connect, windows_db_config, settings, mock_conn_factory
+):
+    mock_conn, mock_cursor = mock_conn_factory(rows=[(100, 20250207)])
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    with handler.metadata_cache():
+        assert handler.get_sync_state("test_table", "report_date") == (100, 20250207)
+        assert handler.get_table_count("test_table") == 100
+        assert handler.get_max_value("test_table", "report_date") == 20250207
+    
+    mock_cursor.execute.assert_called_once_with(
+        "SELECT COUNT_BIG(*) as row_count, MAX([report_date]) as max_value FROM [test_table]", ()
+    )
+
+
+@patch('src.database.pyodbc.connect')
+def test_metadata_cache_reuses_lookups(mock_connect, windows_db_config, settings, mock_conn_factory):
+    mock_conn, mock_cursor = mock_conn_factory(description=[('count',)], rows=[(50,)])
+    mock_connect.return_value = mock_conn
+    
+    connection = DatabaseConnection(windows_db_config, settings)
+    handler = DatabaseHandler(connection)
+    
+    with handler.metadata_cache():
+        assert handler.get_table_count("test_table") == 50
+        assert handler.get_table_count("test_table") == 50
+        assert mock_cursor.execute.call_count == 1
+        
+        handler.bulk_insert("test_table", ['id'], [(1,)])
+        handler.get_table_count("test_table")
+        assert mock_cursor.execute.call_count == 2
+    
+    handler.get_table_count("test_table")
+    assert mock_cursor.execute.call_count == 3
@@ -114,12 +114,8 @@ def test_database_handler_execute_query(mock_pyodbc, windows_db_config, settings
     
     result = handler.execute_query("SELECT * FROM test_table")
     
-    expected = [
-        {'col1': 'val1', 'col2': 'val2'},
-        {'col1': 'val3', 'col2': 'val4'}
-    ]
-    
-    assert result == expected
+    assert result.columns == ('col1', 'col2')
+    assert result.rows == [('val1', 'val2'), ('val3', 'val4')]
     mock_cursor.execute.assert_called_once_with("SELECT * FROM test_table", ())
 
 
@@ -161,7 +157,7 @@ def test_get_max_value(mock_pyodbc, windows_db_config, settings):
     result = handler.get_max_value("test_table", "id")
     
     assert result == 100
-    mock_cursor.execute.assert_called_once_with("SELECT MAX(id) as max_value FROM test_table", ())
+    mock_cursor.execute.assert_called_once_with("SELECT MAX([id]) as max_value FROM [test_table]", ())
 
 
 @patch('src.database.pyodbc')
@@ -182,4 +178,4 @@ def test_get_table_count(mock_pyodbc, windows_db_config, settings):
     result = handler.get_table_count("test_table")
     
     assert result == 50
-    mock_cursor.execute.assert_called_once_with("SELECT COUNT(*) as count FROM test_table", ())
\ No newline at end of file
+    mock_cursor.execute.assert_called_once_with("SELECT COUNT(*) as count FROM [test_table]", ())
\ No newline at end of file
@@ -1,23 +1,94 @@
 import pytest
 import sys
-from unittest.mock import Mock, patch, MagicMock
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock, patch
 
+from src.config import ConfigManager, DatabaseConfig, Settings, TableConfig
+from src.database import DatabaseConnection
+from src.data_refresh import DataRefreshService
+from src.refresh_strategies import SimpleCopyStrategy, StagingPartitionSwitchStrategy
+from tests.conftest import dump_yaml
 
-@pytest.fixture(autouse=True)
+
+@pytest.fixture(scope="module", autouse=True)
 def mock_pyodbc():
-    # Mock pyodbc module at the system level
-    mock_pyodbc = MagicMock()
-    sys.modules['pyodbc'] = mock_pyodbc
-    yield mock_pyodbc
-    # Clean up
-    if 'pyodbc' in sys.modules:
-        del sys.modules['pyodbc']
+    # conftest installs the stub before collection when pyodbc itself is not available
+    return sys.modules['pyodbc']
 
 
-def test_database_connection_creation(mock_pyodbc):
-    from src.database import DatabaseConnection
-    from src.config import DatabaseConfig, Settings
+_EXPECTED_WINDOWS_CONN = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=test-server;"
+    "DATABASE=TestDB;"
+    "Trusted_Connection=yes;"
+    "Connection Timeout=30;"
+)
+
+INTEGRATION_SETTINGS = {
+    "default_batch_size": 1000,
+    "connection_timeout": 30,
+    "command_timeout": 300,
+    "max_retries": 3
+}
+
+INTEGRATION_DATABASES = {
+    "source": {"server": "src", "database": "db", "auth_type": "windows"},
+    "target": {"server": "tgt", "database": "db", "auth_type": "sql"}
+}
+
+PARTITIONED_CONFIG = {
+    "databases": INTEGRATION_DATABASES,
+    "tables": [{
+        "name": "PartitionedTable",
+        "strategy": "staging_partition_switch",
+        "sync_mode": "incremental",
+        "incremental_column": "report_date",
+        "partition_function": "pf_PartitionedTable",
+        "partition_scheme": "ps_PartitionedTable"
+    }],
+    "settings": INTEGRATION_SETTINGS
+}
+
+
+@pytest.fixture(scope="session")
+def integration_config_files(tmp_path_factory):
+    configs = {
+        "simple": {
+            "databases": INTEGRATION_DATABASES,
+            "tables": [{
+                "name": "TestTable",
+                "strategy": "simple_copy",
+                "sync_mode": "full_replace"
+            }],
+            "settings": INTEGRATION_SETTINGS
+        },
+        "parallel": {
+            "databases": INTEGRATION_DATABASES,
+            "tables": [
+                {"name": f"Table{i}", "strategy": "simple_copy", "sync_mode": "full_replace"}
+                for i in range(3)
+            ],
+            "settings": dict(INTEGRATION_SETTINGS, max_workers=3)
+        }
+    }
     
+    config_dir = tmp_path_factory.mktemp("integration")
+    paths = {}
+    for name, config_data in configs.items():
+        path = config_dir / f"{name}.yaml"
+        path.write_text(dump_yaml(config_data))
+        paths[name] = str(path)
+    
+    return paths
+
+
+@pytest.fixture(scope="module")
+def data_refresh_service(mock_pyodbc, integration_config_files):
+    return DataRefreshService(integration_config_files["simple"])
+
+
+def test_database_connection_creation(mock_pyodbc):
     config = DatabaseConfig(
         server="test-server",
         database="TestDB", 
@@ -32,22 +103,10 @@ def test_database_connection_creation(mock_pyodbc):
     
     connection = DatabaseConnection(config, settings)
     
-    expected = (
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=test-server;"
-        "DATABASE=TestDB;"
-        "Trusted_Connection=yes;"
-        "Connection Timeout=30;"
-    )
-    
-    assert connection._connection_string == expected
+    assert connection._connection_string == _EXPECTED_WINDOWS_CONN
 
 
 def test_simple_copy_strategy_full_replace(mock_pyodbc):
-    from src.refresh_strategies import SimpleCopyStrategy
-    from src.config import TableConfig
-    from unittest.mock import Mock
-    
     config = TableConfig(
         name="TestTable",
         strategy="simple_copy",
@@ -58,8 +117,9 @@ def test_simple_copy_strategy_full_replace(mock_pyodbc):
     source_handler = Mock()
     target_handler = Mock()
     
-    test_data = [{'id': 1, 'name': 'Test1'}]
-    source_handler.execute_query.return_value = test_data
+    columns = ['id', 'name']
+    test_data = [(1, 'Test1')]
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 1
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, config)
@@ -72,36 +132,7 @@ def test_simple_copy_strategy_full_replace(mock_pyodbc):
     target_handler.truncate_table.assert_called_once_with("TestTable")
 
 
-def test_partition_strategy_get_required_partitions(mock_pyodbc):
-    from src.refresh_strategies import StagingPartitionSwitchStrategy
-    from src.config import TableConfig
-    from datetime import datetime
-    from unittest.mock import Mock
-    
-    config = TableConfig(
-        name="DailyReports",
-        strategy="staging_partition_switch",
-        sync_mode="incremental",
-        incremental_column="report_date"
-    )
-    
-    strategy = StagingPartitionSwitchStrategy(Mock(), Mock(), config)
-    
-    data = [
-        {'report_date': datetime(2025, 2, 7)},
-        {'report_date': datetime(2025, 2, 8)},
-        {'report_date': 20250209}  # Also test integer format
-    ]
-    
-    partitions = strategy._get_required_partitions(data)
-    assert sorted(partitions) == [20250207, 20250208, 20250209]
-
-
 def test_partition_strategy_ensure_partitions_exist(mock_pyodbc):
-    from src.refresh_strategies import StagingPartitionSwitchStrategy
-    from src.config import TableConfig
-    from unittest.mock import Mock, patch
-    
     config = TableConfig(
         name="DailyReports",
         strategy="staging_partition_switch",
@@ -115,89 +146,96 @@ def test_partition_strategy_ensure_partitions_exist(mock_pyodbc):
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, config)
     
     with patch.object(strategy, '_get_existing_partitions', return_value=[20250206]):
-        with patch.object(strategy, '_create_partition') as mock_create:
+        with patch.object(strategy, '_create_partitions') as mock_create:
             created = strategy._ensure_partitions_exist([20250206, 20250207, 20250208])
             
             assert created == [20250207, 20250208]
-            assert mock_create.call_count == 2
-            mock_create.assert_any_call(20250207)
-            mock_create.assert_any_call(20250208)
+            mock_create.assert_called_once_with([20250207, 20250208])
 
 
 def test_config_table_with_partitions(mock_pyodbc):
-    from src.config import ConfigManager, TableConfig
-    import tempfile
-    import yaml
-    import os
-    
-    config_data = {
-        "databases": {
-            "source": {"server": "src", "database": "db", "auth_type": "windows"},
-            "target": {"server": "tgt", "database": "db", "auth_type": "sql"}
-        },
-        "tables": [{
-            "name": "PartitionedTable",
-            "strategy": "staging_partition_switch",
-            "sync_mode": "incremental",
-            "incremental_column": "report_date",
-            "partition_function": "pf_PartitionedTable",
-            "partition_scheme": "ps_PartitionedTable"
-        }],
-        "settings": {
-            "default_batch_size": 1000,
-            "connection_timeout": 30,
-            "command_timeout": 300,
-            "max_retries": 3
-        }
-    }
+    config_manager = ConfigManager.from_dict(PARTITIONED_CONFIG)
+    table_config = config_manager.get_table_config("PartitionedTable")
+    
+    assert isinstance(table_config, TableConfig)
+    assert table_config.partition_function == "pf_PartitionedTable"
+    assert table_config.partition_scheme == "ps_PartitionedTable"
+
+
+def test_data_refresh_service_creation(data_refresh_service):
+    service = data_refresh_service
+    assert service.config_manager is not None
+    assert service.source_connection is not None
+    assert service.target_connection is not None
+
+
+def test_refresh_all_tables_runs_in_parallel(mock_pyodbc, integration_config_files):
+    service = DataRefreshService(integration_config_files["parallel"])
+    barrier = threading.Barrier(3, timeout=5)
+    
+    def refresh(table_name):
+        barrier.wait()  # only passes if all three tables run concurrently
+        return {"table_name": table_name, "status": "success"}
+    
+    with patch.object(service, 'refresh_table', side_effect=refresh):
+        results = service.refresh_all_tables()
+    
+    assert [r['table_name'] for r in results] == ["Table0", "Table1", "Table2"]
+
+
+def test_refresh_all_tables_caps_workers_at_table_count(data_refresh_service):
+    result = {"table_name": "TestTable", "status": "success"}
+    
+    with patch.object(data_refresh_service, 'refresh_table', return_value=result):
+        with patch('src.data_refresh.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as mock_executor:
+            results = data_refresh_service.refresh_all_tables(max_workers=8)
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-        yaml.dump(config_data, f)
-        config_file = f.name
+    assert results == [result]
+    mock_executor.assert_called_once_with(max_workers=1)
+
+
+def test_table_status_cached_until_refresh(mock_pyodbc, integration_config_files):
+    service = DataRefreshService(integration_config_files["simple"])
     
-    try:
-        config_manager = ConfigManager(config_file)
-        table_config = config_manager.get_table_config("PartitionedTable")
+    with patch.object(service.source_handler, 'get_table_count', return_value=10) as source_count, \
+            patch.object(service.target_handler, 'get_table_count', return_value=5), \
+            patch('src.data_refresh.get_strategy') as mock_get_strategy:
+        mock_get_strategy.return_value.refresh_table.return_value = {"table_name": "TestTable", "status": "success"}
         
-        assert isinstance(table_config, TableConfig)
-        assert table_config.partition_function == "pf_PartitionedTable"
-        assert table_config.partition_scheme == "ps_PartitionedTable"
-    finally:
-        os.unlink(config_file)
-
-
-def test_data_refresh_service_creation(mock_pyodbc):
-    from src.data_refresh import DataRefreshService
-    import tempfile
-    import yaml
-    import os
-    
-    config_data = {
-        "databases": {
-            "source": {"server": "src", "database": "db", "auth_type": "windows"},
-            "target": {"server": "tgt", "database": "db", "auth_type": "sql"}
-        },
-        "tables": [{
-            "name": "TestTable",
-            "strategy": "simple_copy",
-            "sync_mode": "full_replace"
-        }],
-        "settings": {
-            "default_batch_size": 1000,
-            "connection_timeout": 30,
-            "command_timeout": 300,
-            "max_retries": 3
-        }
-    }
+        first = service.get_table_status()
+        assert service.get_table_status() is first
+        assert source_count.call_count == 1
+        
+        assert service.get_table_status(use_cache=False) is not first
+        assert source_count.call_count == 2
+        
+        service.refresh_table("TestTable")
+        service.get_table_status()
+        assert source_count.call_count == 3
+
+
+def test_table_status_not_cached_across_invalidation(mock_pyodbc, integration_config_files):
+    service = DataRefreshService(integration_config_files["simple"])
+    
+    def count_and_invalidate(table_name):
+        service._invalidate_status_cache()  # a refresh finishing mid-compute must not block or be overwritten
+        return 10
+    
+    with patch.object(service.source_handler, 'get_table_count', side_effect=count_and_invalidate) as source_count, \
+            patch.object(service.target_handler, 'get_table_count', return_value=5):
+        service.get_table_status()
+        service.get_table_status()
+    
+    assert source_count.call_count == 2
+
+
+def test_table_status_cache_stays_bounded(mock_pyodbc, integration_config_files):
+    service = DataRefreshService(integration_config_files["simple"])
+    
+    with patch.object(service.source_handler, 'get_table_count', return_value=10), \
+            patch.object(service.target_handler, 'get_table_count', return_value=5):
+        assert service.get_table_status("NoSuchTable") == []
+        service.get_table_status("TestTable")
     
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-        yaml.dump(config_data, f)
-        config_file = f.name
-    
-    try:
-        service = DataRefreshService(config_file)
-        assert service.config_manager is not None
-        assert service.source_connection is not None
-        assert service.target_connection is not None
-    finally:
-        os.unlink(config_file)
\ No newline at end of file
+    assert list(service._status_cache) == [("status", "TestTable")]
+    assert service._status_compute_locks == {}
@@ -1,15 +1,31 @@
 import pytest
+from collections import namedtuple
+from contextlib import nullcontext
 from unittest.mock import Mock, patch
-from datetime import datetime, timedelta
-from src.refresh_strategies import SimpleCopyStrategy, StagingPartitionSwitchStrategy, get_strategy
+from datetime import date, datetime, timedelta
+from src.refresh_strategies import (
+    SimpleCopyStrategy, StagingPartitionSwitchStrategy, get_strategy, load_existing_partitions, register_strategy
+)
 from src.config import TableConfig
 from src.database import DatabaseHandler
 
 
+def as_rows(records):
+    Row = namedtuple("Row", records[0].keys())
+    return [Row(**record) for record in records]
+
+
+def column_rows(records):
+    defaults = {'identity_seed': None, 'identity_increment': None, 'computed_definition': None,
+                'is_persisted': False, 'default_definition': None}
+    return as_rows([dict(defaults, name=record['column_name'].strip('[]'), **record) for record in records])
+
+
 @pytest.fixture
 def mock_handlers():
     source_handler = Mock(spec=DatabaseHandler)
     target_handler = Mock(spec=DatabaseHandler)
+    target_handler.transaction.side_effect = nullcontext
     return source_handler, target_handler
 
 
@@ -63,20 +79,21 @@ def partition_switch_config():
 def test_full_replace_strategy(mock_handlers, full_replace_config):
     source_handler, target_handler = mock_handlers
     
+    columns = ['id', 'name']
     test_data = [
-        {'id': 1, 'name': 'Test1'},
-        {'id': 2, 'name': 'Test2'}
+        (1, 'Test1'),
+        (2, 'Test2')
     ]
     
-    source_handler.execute_query.return_value = test_data
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 2
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, full_replace_config)
     result = strategy.refresh_table()
     
     target_handler.truncate_table.assert_called_once_with("TestTable")
-    source_handler.execute_query.assert_called_once_with("SELECT * FROM TestTable")
-    target_handler.bulk_insert.assert_called_once_with("TestTable", test_data, 5000)
+    source_handler.execute_query_columnar.assert_called_once_with("SELECT * FROM [TestTable]")
+    target_handler.bulk_insert.assert_called_once_with("TestTable", columns, test_data, 5000)
     
     assert result['table_name'] == "TestTable"
     assert result['strategy'] == "simple_copy"
@@ -85,25 +102,98 @@ def test_full_replace_strategy(mock_handlers, full_replace_config):
     assert result['status'] == "success"
 
 
+def test_full_replace_server_side_copy(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(
+        name="TestTable",
+        strategy="simple_copy",
+        sync_mode="full_replace",
+        server_side_copy=True
+    )
+    
+    source_handler.is_same_server.return_value = True
+    target_handler.copy_from.return_value = 10
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, config)
+    result = strategy.refresh_table()
+    
+    target_handler.copy_from.assert_called_once_with(source_handler, "TestTable", "")
+    source_handler.execute_query_columnar.assert_not_called()
+    target_handler.bulk_insert.assert_not_called()
+    assert result['rows_processed'] == 10
+
+
+def test_full_replace_server_side_copy_different_servers(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(
+        name="TestTable",
+        strategy="simple_copy",
+        sync_mode="full_replace",
+        server_side_copy=True
+    )
+    
+    source_handler.is_same_server.return_value = False
+    source_handler.execute_query_columnar.return_value = (['id'], [])
+    target_handler.bulk_insert.return_value = 0
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, config)
+    strategy.refresh_table()
+    
+    target_handler.copy_from.assert_not_called()
+    source_handler.execute_query_columnar.assert_called_once_with("SELECT * FROM [TestTable]")
+
+
+@pytest.mark.parametrize("same_server", [True, False])
+def test_incremental_server_side_copy(mock_handlers, same_server):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(
+        name="TestTable",
+        strategy="simple_copy",
+        sync_mode="incremental",
+        incremental_column="id",
+        incremental_type="identity",
+        server_side_copy=True
+    )
+    
+    source_handler.is_same_server.return_value = same_server
+    target_handler.get_max_value.return_value = 5
+    target_handler.copy_from.return_value = 3
+    source_handler.execute_query_columnar.return_value = (['id'], [(6,), (7,), (8,)])
+    target_handler.bulk_insert.return_value = 3
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, config)
+    result = strategy.refresh_table()
+    
+    assert result['rows_processed'] == 3
+    if same_server:
+        target_handler.copy_from.assert_called_once_with(source_handler, "TestTable", " WHERE [id] > ?", (5,))
+        source_handler.execute_query_columnar.assert_not_called()
+        target_handler.bulk_insert.assert_not_called()
+    else:
+        target_handler.copy_from.assert_not_called()
+        source_handler.execute_query_columnar.assert_called_once_with("SELECT * FROM [TestTable] WHERE [id] > ?", (5,))
+
+
 def test_incremental_strategy_with_existing_data(mock_handlers, incremental_config):
     source_handler, target_handler = mock_handlers
     
     target_handler.get_max_value.return_value = 5
     
+    columns = ['id', 'name']
     test_data = [
-        {'id': 6, 'name': 'Test6'},
-        {'id': 7, 'name': 'Test7'}
+        (6, 'Test6'),
+        (7, 'Test7')
     ]
     
-    source_handler.execute_query.return_value = test_data
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 2
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, incremental_config)
     result = strategy.refresh_table()
     
     target_handler.get_max_value.assert_called_once_with("TestTable", "id")
-    source_handler.execute_query.assert_called_once_with("SELECT * FROM TestTable WHERE id > 5")
-    target_handler.bulk_insert.assert_called_once_with("TestTable", test_data, 5000)
+    source_handler.execute_query_columnar.assert_called_once_with("SELECT * FROM [TestTable] WHERE [id] > ?", (5,))
+    target_handler.bulk_insert.assert_called_once_with("TestTable", columns, test_data, 5000)
     
     assert result['sync_mode'] == "incremental"
     assert result['rows_processed'] == 2
@@ -115,51 +205,102 @@ def test_incremental_strategy_no_existing_data(mock_handlers, incremental_config
     
     target_handler.get_max_value.return_value = None
     
+    columns = ['id', 'name']
     test_data = [
-        {'id': 1, 'name': 'Test1'},
-        {'id': 2, 'name': 'Test2'}
+        (1, 'Test1'),
+        (2, 'Test2')
     ]
     
-    source_handler.execute_query.return_value = test_data
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 2
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, incremental_config)
     result = strategy.refresh_table()
     
-    source_handler.execute_query.assert_called_once_with("SELECT * FROM TestTable")
+    source_handler.execute_query_columnar.assert_called_once_with("SELECT * FROM [TestTable]")
     assert result['sync_mode'] == "full_replace"
 
 
 def test_smart_sync_empty_target(mock_handlers, smart_sync_config):
     source_handler, target_handler = mock_handlers
     
-    target_handler.get_table_count.return_value = 0
+    target_handler.get_sync_state.return_value = (0, None)
     
-    test_data = [{'id': 1, 'name': 'Test1'}]
-    source_handler.execute_query.return_value = test_data
+    columns = ['id', 'name']
+    test_data = [(1, 'Test1')]
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 1
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, smart_sync_config)
     result = strategy.refresh_table()
     
-    target_handler.get_table_count.assert_called_once_with("TestTable")
+    target_handler.get_sync_state.assert_called_once_with("TestTable", "updated_at")
+    target_handler.get_table_count.assert_not_called()
     assert result['sync_mode'] == "smart_sync_full"
 
 
 def test_smart_sync_existing_target(mock_handlers, smart_sync_config):
     source_handler, target_handler = mock_handlers
     
-    target_handler.get_table_count.return_value = 100
-    target_handler.get_max_value.return_value = datetime.now()
+    max_value = datetime.now()
+    target_handler.get_sync_state.return_value = (100, max_value)
+    source_handler.get_sync_state.return_value = (105, max_value + timedelta(minutes=5))
     
+    columns = ['id', 'name']
     test_data = []
-    source_handler.execute_query.return_value = test_data
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
     target_handler.bulk_insert.return_value = 0
     
     strategy = SimpleCopyStrategy(source_handler, target_handler, smart_sync_config)
     result = strategy.refresh_table()
     
     assert result['sync_mode'] == "smart_sync_incremental"
+    assert result['incremental_from'] == str(max_value)
+    target_handler.get_max_value.assert_not_called()
+    source_handler.execute_query_columnar.assert_called_once_with(
+        "SELECT * FROM [TestTable] WHERE [updated_at] > ?", (max_value,)
+    )
+
+
+def test_smart_sync_skips_when_source_matches_target(mock_handlers, smart_sync_config):
+    source_handler, target_handler = mock_handlers
+    
+    max_value = datetime(2025, 2, 7, 12, 0)
+    source_handler.get_sync_state.return_value = (100, max_value)
+    target_handler.get_sync_state.return_value = (100, max_value)
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, smart_sync_config)
+    result = strategy.refresh_table()
+    
+    assert result['sync_mode'] == "smart_sync_noop"
+    assert result['rows_processed'] == 0
+    assert result['status'] == "success"
+    source_handler.get_sync_state.assert_called_once_with("TestTable", "updated_at")
+    source_handler.execute_query_columnar.assert_not_called()
+    target_handler.bulk_insert.assert_not_called()
+
+
+def test_smart_sync_with_date_buffer_never_skips(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(
+        name="TestTable",
+        strategy="simple_copy",
+        sync_mode="smart_sync",
+        incremental_column="updated_at",
+        incremental_type="datetime",
+        date_buffer_days=1
+    )
+    
+    max_value = datetime(2025, 2, 7, 12, 0)
+    target_handler.get_sync_state.return_value = (100, max_value)
+    source_handler.execute_query_columnar.return_value = (['id'], [])
+    target_handler.bulk_insert.return_value = 0
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, config)
+    result = strategy.refresh_table()
+    
+    assert result['sync_mode'] == "smart_sync_incremental"
+    source_handler.get_sync_state.assert_not_called()
 
 
 def test_date_buffer_where_clause():
@@ -181,7 +322,33 @@ def test_date_buffer_where_clause():
     where_clause = strategy._build_incremental_where_clause(max_date)
     expected_date = max_date - timedelta(days=7)
     
-    assert where_clause == f"report_date >= '{expected_date}'"
+    assert where_clause == ("[report_date] >= ?", (expected_date,))
+
+
+def test_identity_where_clause_is_parameterized(mock_handlers, incremental_config):
+    source_handler, target_handler = mock_handlers
+    strategy = SimpleCopyStrategy(source_handler, target_handler, incremental_config)
+    
+    assert strategy._build_incremental_where_clause(5) == ("[id] > ?", (5,))
+    assert strategy._build_incremental_where_clause("5; DROP TABLE x") == ("[id] > ?", ("5; DROP TABLE x",))
+
+
+def test_table_identifiers_are_quoted(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(name="dbo.Users", strategy="simple_copy", sync_mode="full_replace")
+    
+    strategy = SimpleCopyStrategy(source_handler, target_handler, config)
+    
+    assert strategy._select_all_sql == "SELECT * FROM [dbo].[Users]"
+
+
+def test_invalid_table_identifier_rejected(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    
+    for name in ["Users; DROP TABLE x", "[Users]", "1Users", "dbo..Users"]:
+        config = TableConfig(name=name, strategy="simple_copy", sync_mode="full_replace")
+        with pytest.raises(ValueError, match="Invalid SQL identifier"):
+            SimpleCopyStrategy(source_handler, target_handler, config)
 
 
 def test_get_strategy_simple_copy(mock_handlers):
@@ -211,25 +378,46 @@ def test_get_strategy_unknown():
         get_strategy(source_handler, target_handler, config)
 
 
+def test_register_strategy(monkeypatch, mock_handlers):
+    from src import refresh_strategies
+    monkeypatch.setattr(refresh_strategies, '_STRATEGIES', dict(refresh_strategies._STRATEGIES))
+    
+    class CustomStrategy(SimpleCopyStrategy):
+        pass
+    
+    register_strategy("custom_copy", CustomStrategy)
+    
+    source_handler, target_handler = mock_handlers
+    existing_partitions = {}
+    config = TableConfig(name="Test", strategy="custom_copy", sync_mode="full_replace")
+    
+    strategy = get_strategy(source_handler, target_handler, config, existing_partitions)
+    
+    assert isinstance(strategy, CustomStrategy)
+    assert strategy.existing_partitions is existing_partitions
+
+
 def test_partition_switch_strategy_basic(mock_handlers, partition_switch_config):
     source_handler, target_handler = mock_handlers
     
+    columns = ['report_date', 'amount']
     test_data = [
-        {'report_date': 20250207, 'amount': 100.0},
-        {'report_date': 20250208, 'amount': 150.0}
+        (20250207, 100.0),
+        (20250208, 150.0)
     ]
     
-    source_handler.execute_query.return_value = test_data
-    target_handler.get_max_value.return_value = 20250206
-    target_handler.execute_query.return_value = []  # No existing partitions
+    source_handler.execute_query_columnar.return_value = (columns, test_data)
+    target_handler.get_max_value.return_value = datetime(2025, 2, 6)
+    target_handler.execute_query_rows.return_value = []  # No existing partitions
     target_handler.bulk_insert.return_value = 2
     
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     
-    with patch.object(strategy, '_ensure_partitions_exist', return_value=[20250207, 20250208]):
-        with patch.object(strategy, '_apply_indexes_and_constraints'):
-            with patch.object(strategy, '_switch_partitions'):
-                result = strategy.refresh_table()
+    with patch.object(strategy, '_create_staging_table'), \
+            patch.object(strategy, '_ensure_partitions_exist', return_value=[20250207, 20250208]), \
+            patch.object(strategy, '_apply_indexes_and_constraints'), \
+            patch.object(strategy, '_switch_partitions'):
+        result = strategy.refresh_table()
     
     assert result['table_name'] == "DailyReports"
     assert result['strategy'] == "staging_partition_switch"
@@ -237,81 +425,315 @@ def test_partition_switch_strategy_basic(mock_handlers, partition_switch_config)
     assert result['partitions_created'] == [20250207, 20250208]
 
 
-def test_get_required_partitions_from_datetime():
-    source_handler = Mock(spec=DatabaseHandler)
-    target_handler = Mock(spec=DatabaseHandler)
+def test_partition_switch_reads_partitions_from_staging(mock_handlers):
+    source_handler, target_handler = mock_handlers
     config = TableConfig(
-        name="TestTable",
+        name="DailyReports",
         strategy="staging_partition_switch",
-        sync_mode="incremental",
-        incremental_column="report_date"
+        sync_mode="full_replace",
+        incremental_column="report_date",
+        partition_function="pf_DailyReports"
     )
     
+    columns = ['report_date', 'amount']
+    source_handler.execute_query_columnar.return_value = (columns, iter([
+        (20250208, 100.0),
+        (20250207, 150.0),
+        (20250208, 175.0)
+    ]))
+    target_handler.bulk_insert.side_effect = lambda name, cols, rows, batch_size, **kwargs: len(list(rows))
+    target_handler.execute_query_rows.side_effect = [
+        column_rows([
+            {'column_name': '[report_date]', 'type_name': 'int', 'max_length': 4, 'precision': 10, 'scale': 0,
+             'is_nullable': False, 'collation_name': None}
+        ]),
+        as_rows([{'partition_value': 20250208}, {'partition_value': 20250207}])
+    ]
+    
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, config)
+    queries_before_index = []
     
-    data = [
-        {'report_date': datetime(2025, 2, 7, 10, 30)},
-        {'report_date': datetime(2025, 2, 8, 15, 45)},
-        {'report_date': datetime(2025, 2, 7, 20, 15)}  # Duplicate date
-    ]
+    def apply_indexes(staging_table):
+        queries_before_index.append(target_handler.execute_query_rows.call_count)
     
-    partitions = strategy._get_required_partitions(data)
+    with patch.object(strategy, '_ensure_partitions_exist', return_value=[]) as mock_ensure:
+        with patch.object(strategy, '_apply_indexes_and_constraints', side_effect=apply_indexes):
+            with patch.object(strategy, '_switch_partitions') as mock_switch:
+                result = strategy.refresh_table()
     
-    assert partitions == [20250207, 20250208]
+    assert result['rows_processed'] == 3
+    assert queries_before_index == [1]  # only the column lookup; the DISTINCT runs against the indexed staging table
+    distinct_query = target_handler.execute_query_rows.call_args[0][0]
+    assert "SELECT DISTINCT [report_date] as partition_value" in distinct_query
+    assert "FROM [DailyReports_staging]" in distinct_query
+    mock_ensure.assert_called_once_with([20250207, 20250208])
+    mock_switch.assert_called_once_with("DailyReports_staging", [20250207, 20250208])
 
 
-def test_get_required_partitions_from_int():
-    source_handler = Mock(spec=DatabaseHandler)
-    target_handler = Mock(spec=DatabaseHandler)
+def test_distinct_partitions_from_staging_casts_dates(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    target_handler.execute_query_rows.return_value = as_rows([
+        {'partition_value': date(2025, 2, 8)},
+        {'partition_value': date(2025, 2, 7)}
+    ])
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    assert strategy._distinct_partitions_from_staging("DailyReports_staging") == [20250207, 20250208]
+    assert "CAST([report_date] AS date)" in target_handler.execute_query_rows.call_args[0][0]
+
+
+def test_partition_switch_no_source_rows(mock_handlers):
+    source_handler, target_handler = mock_handlers
     config = TableConfig(
-        name="TestTable",
+        name="DailyReports",
         strategy="staging_partition_switch",
-        sync_mode="incremental",
+        sync_mode="full_replace",
         incremental_column="report_date"
     )
     
+    source_handler.execute_query_columnar.return_value = (['report_date'], iter([]))
+    
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, config)
+    result = strategy.refresh_table()
     
-    data = [
-        {'report_date': 20250207},
-        {'report_date': 20250208},
-        {'report_date': 20250207}  # Duplicate
+    assert result['rows_processed'] == 0
+    target_handler.bulk_insert.assert_not_called()
+
+
+def test_staging_and_temp_tables_share_cached_column_ddl(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    target_handler.execute_query_rows.return_value = column_rows([
+        {'column_name': '[report_date]', 'type_name': 'int', 'max_length': 4, 'precision': 10, 'scale': 0,
+         'is_nullable': False, 'collation_name': None},
+        {'column_name': '[name]', 'type_name': 'nvarchar', 'max_length': 100, 'precision': 0, 'scale': 0,
+         'is_nullable': True, 'collation_name': 'Latin1_General_CI_AS'},
+        {'column_name': '[notes]', 'type_name': 'varchar', 'max_length': -1, 'precision': 0, 'scale': 0,
+         'is_nullable': True, 'collation_name': 'Latin1_General_CI_AS'},
+        {'column_name': '[amount]', 'type_name': 'decimal', 'max_length': 9, 'precision': 18, 'scale': 2,
+         'is_nullable': True, 'collation_name': None},
+        {'column_name': '[loaded_at]', 'type_name': 'datetime2', 'max_length': 8, 'precision': 27, 'scale': 7,
+         'is_nullable': False, 'collation_name': None}
+    ])
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    strategy._create_staging_table("DailyReports_staging")
+    strategy._create_table_like_target("DailyReports_temp_20250207")
+    
+    columns_ddl = (
+        "[report_date] int NOT NULL, [name] nvarchar(50) COLLATE Latin1_General_CI_AS NULL, "
+        "[notes] varchar(MAX) COLLATE Latin1_General_CI_AS NULL, [amount] decimal(18, 2) NULL, "
+        "[loaded_at] datetime2(7) NOT NULL"
+    )
+    target_handler.execute_query_rows.assert_called_once()
+    assert target_handler.execute_query_rows.call_args[0][1] == ("DailyReports",)
+    assert [c[0][0] for c in target_handler.execute_non_query.call_args_list] == [
+        f"CREATE TABLE [DailyReports_staging] ({columns_ddl})",
+        f"CREATE TABLE [DailyReports_temp_20250207] ({columns_ddl})"
     ]
+
+
+def test_staging_ddl_keeps_identity_computed_and_default_columns(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    target_handler.execute_query_rows.return_value = column_rows([
+        {'column_name': '[id]', 'type_name': 'bigint', 'max_length': 8, 'precision': 19, 'scale': 0,
+         'is_nullable': False, 'collation_name': None, 'identity_seed': '1', 'identity_increment': '1'},
+        {'column_name': '[report_date]', 'type_name': 'int', 'max_length': 4, 'precision': 10, 'scale': 0,
+         'is_nullable': False, 'collation_name': None, 'default_definition': '((0))'},
+        {'column_name': '[report_year]', 'type_name': 'int', 'max_length': 4, 'precision': 10, 'scale': 0,
+         'is_nullable': True, 'collation_name': None, 'computed_definition': '([report_date]/(10000))',
+         'is_persisted': True}
+    ])
+    loaded = []
+    
+    def bulk_insert(name, cols, rows, batch_size, **kwargs):
+        loaded.extend(rows)
+        return len(loaded)
+    
+    target_handler.bulk_insert.side_effect = bulk_insert
+    source_data = (['id', 'report_date', 'report_year'], iter([(7, 20250207, 2025)]))
     
-    partitions = strategy._get_required_partitions(data)
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    with patch.object(strategy, '_get_incremental_data', return_value=source_data):
+        with patch.object(strategy, '_distinct_partitions_from_staging', return_value=[]):
+            strategy.refresh_table()
     
-    assert partitions == [20250207, 20250208]
+    assert target_handler.execute_non_query.call_args_list[0][0][0] == (
+        "CREATE TABLE [DailyReports_staging] ([id] bigint NOT NULL IDENTITY(1, 1), "
+        "[report_date] int NOT NULL DEFAULT ((0)), [report_year] AS ([report_date]/(10000)) PERSISTED)"
+    )
+    assert target_handler.bulk_insert.call_args[0][1] == ['id', 'report_date']
+    assert target_handler.bulk_insert.call_args[1] == {'identity_insert': True}
+    assert loaded == [(7, 20250207)]
 
 
-def test_get_required_partitions_empty_data():
-    source_handler = Mock(spec=DatabaseHandler)
-    target_handler = Mock(spec=DatabaseHandler)
+def test_staging_tables_use_configured_compression(mock_handlers):
+    source_handler, target_handler = mock_handlers
     config = TableConfig(
-        name="TestTable",
+        name="DailyReports",
         strategy="staging_partition_switch",
-        sync_mode="incremental",
-        incremental_column="report_date"
+        sync_mode="full_replace",
+        data_compression="page"
     )
+    target_handler.execute_query_rows.side_effect = [
+        column_rows([
+            {'column_name': '[report_date]', 'type_name': 'int', 'max_length': 4, 'precision': 10, 'scale': 0,
+             'is_nullable': False, 'collation_name': None}
+        ]),
+        as_rows([{'index_name': 'IX_DailyReports', 'type_desc': 'CLUSTERED', 'is_unique': False,
+                  'columns': '[report_date]'}])
+    ]
     
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, config)
+    strategy._create_staging_table("DailyReports_staging")
+    strategy._apply_indexes_and_constraints("DailyReports_staging")
+    
+    create_table, create_index = [c[0][0] for c in target_handler.execute_non_query.call_args_list]
+    assert create_table == (
+        "CREATE TABLE [DailyReports_staging] ([report_date] int NOT NULL) WITH (DATA_COMPRESSION = PAGE)"
+    )
+    assert "WITH (SORT_IN_TEMPDB = ON, DATA_COMPRESSION = PAGE)" in create_index
+
+
+def test_unsupported_compression_rejected(mock_handlers):
+    source_handler, target_handler = mock_handlers
+    config = TableConfig(
+        name="DailyReports",
+        strategy="staging_partition_switch",
+        sync_mode="full_replace",
+        data_compression="columnstore"
+    )
+    
+    with pytest.raises(ValueError, match="Unsupported data compression: columnstore"):
+        StagingPartitionSwitchStrategy(source_handler, target_handler, config)
+
+
+def test_switch_partitions_waits_at_low_priority(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    with patch.object(strategy, '_get_partition_number', return_value=3):
+        with patch.object(strategy, '_create_table_like_target'):
+            strategy._switch_partitions("DailyReports_staging", [20250207])
+    
+    switch_out, switch_in, drop_temp = [c[0][0] for c in target_handler.execute_non_query.call_args_list]
+    low_priority = "WITH (WAIT_AT_LOW_PRIORITY (MAX_DURATION = 5 MINUTES, ABORT_AFTER_WAIT = SELF))"
+    assert "SWITCH PARTITION 3 TO [DailyReports_temp_20250207]" in switch_out
+    assert low_priority in switch_out
+    assert "SWITCH PARTITION 3 TO [DailyReports] PARTITION 3" in switch_in
+    assert low_priority in switch_in
+    assert drop_temp == "DROP TABLE IF EXISTS [DailyReports_temp_20250207]"
+
+
+def test_to_partition_dates_from_datetime(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    values = [
+        datetime(2025, 2, 7, 10, 30),
+        datetime(2025, 2, 8, 15, 45),
+        datetime(2025, 2, 7, 20, 15)  # Duplicate date
+    ]
+    
+    assert strategy._to_partition_dates(values) == [20250207, 20250208]
+
+
+def test_to_partition_dates_from_int(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     
-    partitions = strategy._get_required_partitions([])
-    assert partitions == []
+    assert strategy._to_partition_dates([20250208, 20250207, 20250207]) == [20250207, 20250208]
+
+
+def test_to_partition_dates_mixed_types(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    values = [datetime(2025, 2, 7, 13, 30) for _ in range(1000)]
+    values += [datetime(2025, 2, 6).date(), 20250208, "20250209", "not a date", "20251340", None]
+    
+    with patch('src.refresh_strategies.logger') as mock_logger:
+        partitions = strategy._to_partition_dates(values)
+    
+    assert partitions == [20250206, 20250207, 20250208, 20250209]
+    mock_logger.warning.assert_called_once()
+
+
+def test_to_partition_dates_empty(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    
+    assert strategy._to_partition_dates([]) == []
 
 
 def test_get_existing_partitions(mock_handlers, partition_switch_config):
     source_handler, target_handler = mock_handlers
     
-    target_handler.execute_query.return_value = [
+    target_handler.execute_query_rows.return_value = as_rows([
         {'partition_value': 20250205},
         {'partition_value': 20250206}
-    ]
+    ])
     
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     existing_partitions = strategy._get_existing_partitions()
     
     assert existing_partitions == [20250205, 20250206]
-    target_handler.execute_query.assert_called_once()
+    target_handler.execute_query_rows.assert_called_once()
+
+
+def test_get_existing_partitions_from_preloaded_cache(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    cache = {"DailyReports": {20250206, 20250205}}
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config, cache)
+    
+    assert strategy._get_existing_partitions() == [20250205, 20250206]
+    target_handler.execute_query_rows.assert_not_called()
+
+
+def test_create_partition_clears_preloaded_cache(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    cache = {"DailyReports": {20250206}, "OtherReports": {20250206}}
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config, cache)
+    strategy._create_partition(20250207)
+    
+    assert cache == {}
+
+
+def test_tables_sharing_partition_function_share_lock(mock_handlers, partition_switch_config):
+    source_handler, target_handler = mock_handlers
+    other_config = TableConfig(
+        name="OtherReports",
+        strategy="staging_partition_switch",
+        sync_mode="incremental",
+        incremental_column="report_date",
+        partition_function=partition_switch_config.partition_function
+    )
+    
+    strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
+    other = StagingPartitionSwitchStrategy(source_handler, target_handler, other_config)
+    
+    assert strategy._partition_function_lock() is other._partition_function_lock()
+
+
+def test_load_existing_partitions_groups_by_table():
+    target_handler = Mock(spec=DatabaseHandler)
+    target_handler.execute_query_rows.return_value = as_rows([
+        {'table_name': 'DailyReports', 'partition_value': 20250205},
+        {'table_name': 'DailyReports', 'partition_value': 20250206},
+        {'table_name': 'OtherReports', 'partition_value': 20250101}
+    ])
+    
+    existing_partitions = load_existing_partitions(target_handler)
+    
+    assert existing_partitions == {'DailyReports': {20250205, 20250206}, 'OtherReports': {20250101}}
+    target_handler.execute_query_rows.assert_called_once()
+    preload_query = target_handler.execute_query_rows.call_args[0][0]
+    assert "o.name = ?" not in preload_query
+    assert "TRY_CAST(prv.value AS INT) IS NOT NULL" in preload_query
 
 
 def test_ensure_partitions_exist(mock_handlers, partition_switch_config):
@@ -320,13 +742,16 @@ def test_ensure_partitions_exist(mock_handlers, partition_switch_config):
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     
     with patch.object(strategy, '_get_existing_partitions', return_value=[20250206]):
-        with patch.object(strategy, '_create_partition') as mock_create:
-            created = strategy._ensure_partitions_exist([20250206, 20250207, 20250208])
-            
-            assert created == [20250207, 20250208]
-            assert mock_create.call_count == 2
-            mock_create.assert_any_call(20250207)
-            mock_create.assert_any_call(20250208)
+        created = strategy._ensure_partitions_exist([20250206, 20250207, 20250208])
+    
+    assert created == [20250207, 20250208]
+    target_handler.execute_non_query.assert_called_once()
+    actual_query = target_handler.execute_non_query.call_args[0][0]
+    assert "SPLIT RANGE (20250206)" not in actual_query
+    assert "ALTER PARTITION FUNCTION [pf_DailyReports]() SPLIT RANGE (20250207);" in actual_query
+    assert "ALTER PARTITION FUNCTION [pf_DailyReports]() SPLIT RANGE (20250208);" in actual_query
+    assert "BEGIN TRAN" not in actual_query
+    assert "XACT_ABORT" not in actual_query
 
 
 def test_create_partition(mock_handlers, partition_switch_config):
@@ -335,33 +760,25 @@ def test_create_partition(mock_handlers, partition_switch_config):
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     strategy._create_partition(20250207)
     
-    expected_query = """
-        ALTER PARTITION FUNCTION pf_DailyReports()
-        SPLIT RANGE (20250207)
-        """
-    
     target_handler.execute_non_query.assert_called_once()
     actual_query = target_handler.execute_non_query.call_args[0][0]
-    assert "ALTER PARTITION FUNCTION pf_DailyReports()" in actual_query
+    assert "ALTER PARTITION FUNCTION [pf_DailyReports]()" in actual_query
     assert "SPLIT RANGE (20250207)" in actual_query
 
 
 def test_get_partition_number(mock_handlers, partition_switch_config):
     source_handler, target_handler = mock_handlers
     
-    target_handler.execute_query.return_value = [{'partition_number': 5}]
+    target_handler.execute_query_rows.return_value = as_rows([{'partition_number': 5}])
     
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, partition_switch_config)
     partition_num = strategy._get_partition_number(20250207)
     
     assert partition_num == 5
-    expected_query = """
-        SELECT 
-            $PARTITION.pf_DailyReports(20250207) as partition_number
-        """
-    target_handler.execute_query.assert_called_once()
-    actual_query = target_handler.execute_query.call_args[0][0]
-    assert "$PARTITION.pf_DailyReports(20250207)" in actual_query
+    target_handler.execute_query_rows.assert_called_once()
+    actual_query = target_handler.execute_query_rows.call_args[0][0]
+    assert "$PARTITION.[pf_DailyReports](?)" in actual_query
+    assert target_handler.execute_query_rows.call_args[0][1] == (20250207,)
 
 
 def test_partition_function_defaults(mock_handlers):
@@ -374,10 +791,11 @@ def test_partition_function_defaults(mock_handlers):
     )
     
     source_handler, target_handler = mock_handlers
-    target_handler.execute_query.return_value = [{'partition_number': 3}]
+    target_handler.execute_query_rows.return_value = as_rows([{'partition_number': 3}])
     
     strategy = StagingPartitionSwitchStrategy(source_handler, target_handler, config)
     partition_num = strategy._get_partition_number(20250207)
     
-    actual_query = target_handler.execute_query.call_args[0][0]
-    assert "$PARTITION.pf_TestTable(20250207)" in actual_query
\ No newline at end of file
+    assert partition_num == 3
+    actual_query = target_handler.execute_query_rows.call_args[0][0]
+    assert "$PARTITION.[pf_TestTable](?)" in actual_query
\ No newline at end of file
@@ -1,7 +1,12 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask.json.provider import DefaultJSONProvider
 from datetime import datetime
+from functools import lru_cache
 import logging
+import orjson
 import sys
+import threading
+import time
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,22 +16,48 @@ from src.data_refresh import DataRefreshService
 app = Flask(__name__)
 app.secret_key = 'dev-key-change-in-production'
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    # Datetimes go through Flask's default hook so responses keep the same format as the stock provider
+    _options = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+app.json = ORJSONProvider(app)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 service = None
+_service_lock = threading.Lock()
 
 def get_service():
     global service
     if service is None:
-        try:
-            service = DataRefreshService()
-        except Exception as e:
-            logger.error(f"Failed to initialize data refresh service: {e}")
-            service = None
+        with _service_lock:
+            if service is None:
+                try:
+                    service = DataRefreshService()
+                except Exception as e:
+                    logger.error(f"Failed to initialize data refresh service: {e}")
+                    service = None
     return service
 
 
+def _nocache():
+    return request.args.get('nocache') == '1'
+
+
+@lru_cache(maxsize=1)
+def _format_second(epoch_second):
+    return datetime.fromtimestamp(epoch_second).strftime('%Y-%m-%d %H:%M:%S')
+
+
 @app.route('/')
 def index():
     try:
@@ -34,13 +65,14 @@ def index():
         if not refresh_service:
             return render_template('error.html', error="Service not available"), 500
         
-        table_status = refresh_service.get_table_status()
-        connection_status = refresh_service.test_connections()
+        use_cache = not _nocache()
+        table_status = refresh_service.get_table_status(use_cache=use_cache)
+        connection_status = refresh_service.test_connections(use_cache=use_cache)
         
         return render_template('index.html', 
                              table_status=table_status,
                              connection_status=connection_status,
-                             current_time=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                             current_time=_format_second(int(time.time())))
     except Exception as e:
         logger.error(f"Error in index route: {e}")
         return render_template('error.html', error=str(e)), 500
@@ -54,7 +86,7 @@ def api_status():
             return jsonify({"error": "Service not available"}), 500
         
         table_name = request.args.get('table')
-        status = refresh_service.get_table_status(table_name)
+        status = refresh_service.get_table_status(table_name, use_cache=not _nocache())
         return jsonify(status)
     except Exception as e:
         logger.error(f"Error in status API: {e}")
@@ -72,11 +104,9 @@ def api_refresh():
         table_name = data.get('table') if data else None
         
         if table_name:
-            result = refresh_service.refresh_table(table_name)
-        else:
-            result = refresh_service.refresh_all_tables()
+            return jsonify(refresh_service.refresh_table(table_name))
         
-        return jsonify(result)
+        return jsonify(refresh_service.refresh_all_tables())
     except Exception as e:
         logger.error(f"Error in refresh API: {e}")
         return jsonify({"error": str(e)}), 500
@@ -89,7 +119,7 @@ def api_test_connections():
         if not refresh_service:
             return jsonify({"error": "Service not available"}), 500
         
-        results = refresh_service.test_connections()
+        results = refresh_service.test_connections(use_cache=not _nocache())
         return jsonify(results)
     except Exception as e:
         logger.error(f"Error in test connections API: {e}")